@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-import fnmatch
+import functools
+import hashlib
 import json
+import logging
 import os
 import re
-from dataclasses import dataclass
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
 from html import escape
-from typing import Dict, List, Optional, Tuple
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
 
 from aqt import gui_hooks, mw
 from aqt.qt import (
@@ -16,34 +22,89 @@ from aqt.qt import (
     QDialog,
     QDialogButtonBox,
     QFormLayout,
+    QHBoxLayout,
     QLabel,
     QPlainTextEdit,
+    QPushButton,
+    QSpinBox,
+    QTimer,
     QVBoxLayout,
 )
 from aqt.utils import showInfo
 
+from .status_model import (
+    CARD_COUNTS_SQL,
+    CONTAINER_MODE_ALL,
+    CONTAINER_MODE_ANY,
+    CONTAINER_MODE_CHOICES,
+    CONTAINER_MODE_DIRECT,
+    CONTAINER_MODE_HIDE,
+    MAX_REFRESH_COALESCE_MS,
+    MAX_SLOW_QUERY_MS,
+    RENDER_STAGES,
+    STATUS_AVAIL,
+    STATUS_LIMITS,
+    STATUS_NORMAL,
+    DeckHierarchy,
+    DeckInfo,
+    EffectiveConfig,
+    HiddenDeck,
+    RenderJob,
+    RollupTotals,
+    StatusComputationCancelled,
+    _apply_monitoring,
+    _apply_rollup_delta,
+    _build_effective_config,
+    _compute_self_status,
+    _deck_new_limit_override,
+    _derive_rollup_statuses,
+    _hidden_deck_contribution,
+    _link_deck_infos,
+    _normalize_config,
+    _normalize_pattern_list,
+    _parent_name,
+    _preset_new_limit,
+    _render_history,
+    _rollup_contribution,
+    _select_counted_decks,
+    _should_monitor,
+    _should_show_badge,
+    _validate_patterns,
+)
+
 ADDON_DIR = os.path.dirname(__file__)
 CONFIG_PATH = os.path.join(ADDON_DIR, "config.json")
+DIAGNOSTICS_PATH = os.path.join(ADDON_DIR, "render_diagnostics.json")
+SLOW_QUERY_LOG_PATH = os.path.join(ADDON_DIR, "slow_queries.log")
+SLOW_QUERY_LOG_BYTES = 256 * 1024
+SLOW_QUERY_LOG_BACKUPS = 2
+SLOW_QUERY_DETAIL_CHARS = 2000
+COLLECTION_CALL_KINDS_SHOWN = 5
+# Anki keeps user_files when the add-on is updated.
+USER_FILES_DIR = os.path.join(ADDON_DIR, "user_files")
+PERSISTED_STATUS_FORMAT = 1
+STATUS_EXPORT_PATH = os.path.join(USER_FILES_DIR, "deck_status.json")
+STATUS_EXPORT_FORMAT = 2
+STATUS_EXPORT_FIELDS = (
+    "did",
+    "name",
+    "monitored",
+    "counted",
+    "self_status",
+    "direct_status",
+    "descendant_status",
+    "agg_status",
+    "unsuspended_new",
+    "suspended_new",
+    "agg_unsuspended_new",
+    "agg_suspended_new",
+)
 ADDON_VERSION = "0.5.0"
 
-STATUS_LIMITS = "limits"
-STATUS_AVAIL = "availability"
-STATUS_NORMAL = "normal"
-
-CONTAINER_MODE_ANY = "any_blocked_descendant"
-CONTAINER_MODE_ALL = "all_included_descendants_blocked"
-CONTAINER_MODE_HIDE = "hide_container_rows"
-CONTAINER_MODE_DIRECT = "direct_decks_only"
-
-CONTAINER_MODE_CHOICES = [
-    (CONTAINER_MODE_ANY, "Any blocked descendant"),
-    (CONTAINER_MODE_ALL, "All included descendants blocked"),
-    (CONTAINER_MODE_HIDE, "Hide container icons"),
-    (CONTAINER_MODE_DIRECT, "Direct decks only"),
-]
+BADGE_CACHE_SIZE = 4096
 
 BADGE_STYLE = """
-<style>
+<style id="notify-empty-decks-style">
 .notify-empty-decks-badge {
   display: inline-flex;
   align-items: center;
@@ -71,70 +132,378 @@ BADGE_STYLE = """
 </style>
 """
 
+# Tooltip templates; {0}/{1} are the deck's own unsuspended/suspended new cards and {2}/{3}
+# the included subtree's. Compact badges only carry the template's index and the counts.
+SUBTREE_LIMIT_COUNTS = (
+    "Unsuspended new in the included subtree: {2}. Suspended new in the included subtree: {3}."
+)
+SUBTREE_AVAIL_COUNTS = "Suspended new in the included subtree: {3}."
+TOOLTIP_DECK_LIMITS = (
+    "This deck is blocked by a 0/day new-card limit. Unsuspended new: {0}. Suspended new: {1}."
+)
+TOOLTIP_DECK_AVAIL = "This deck has 0 unsuspended new cards available. Suspended new: {1}."
+TOOLTIP_ANY_CONTAINER_LIMITS = (
+    "At least one included child deck under this container is blocked by a 0/day new-card "
+    "limit. " + SUBTREE_LIMIT_COUNTS
+)
+TOOLTIP_ANY_CONTAINER_AVAIL = (
+    "At least one included child deck under this container has 0 unsuspended new cards "
+    "available. " + SUBTREE_AVAIL_COUNTS
+)
+TOOLTIP_ANY_DECK_OR_CHILD_LIMITS = (
+    "This deck or at least one included child deck is blocked by a 0/day new-card limit. "
+    + SUBTREE_LIMIT_COUNTS
+)
+TOOLTIP_ANY_DECK_OR_CHILD_AVAIL = (
+    "This deck or at least one included child deck has 0 unsuspended new cards available. "
+    + SUBTREE_AVAIL_COUNTS
+)
+TOOLTIP_ANY_CHILD_LIMITS = (
+    "At least one included child deck is blocked by a 0/day new-card limit. " + SUBTREE_LIMIT_COUNTS
+)
+TOOLTIP_ANY_CHILD_AVAIL = (
+    "At least one included child deck has 0 unsuspended new cards available. "
+    + SUBTREE_AVAIL_COUNTS
+)
+TOOLTIP_ALL_CONTAINER_LIMITS = (
+    "All included child decks under this container are blocked, and at least one of them is "
+    "blocked by a 0/day new-card limit. " + SUBTREE_LIMIT_COUNTS
+)
+TOOLTIP_ALL_CONTAINER_AVAIL = (
+    "All included child decks under this container have 0 unsuspended new cards available. "
+    + SUBTREE_AVAIL_COUNTS
+)
+TOOLTIP_ALL_DECK_AND_CHILDREN_LIMITS = (
+    "This deck is blocked, and all included child decks are also blocked; at least one of "
+    "them is blocked by a 0/day new-card limit. " + SUBTREE_LIMIT_COUNTS
+)
+TOOLTIP_ALL_DECK_AND_CHILDREN_AVAIL = (
+    "This deck is blocked, and all included child decks also have 0 unsuspended new cards "
+    "available. " + SUBTREE_AVAIL_COUNTS
+)
+TOOLTIP_ALL_CHILDREN_LIMITS = (
+    "All included child decks are blocked, and at least one of them is blocked by a 0/day "
+    "new-card limit. " + SUBTREE_LIMIT_COUNTS
+)
+TOOLTIP_ALL_CHILDREN_AVAIL = (
+    "All included child decks have 0 unsuspended new cards available. " + SUBTREE_AVAIL_COUNTS
+)
+TOOLTIP_TEMPLATES = (
+    TOOLTIP_DECK_LIMITS,
+    TOOLTIP_DECK_AVAIL,
+    TOOLTIP_ANY_CONTAINER_LIMITS,
+    TOOLTIP_ANY_CONTAINER_AVAIL,
+    TOOLTIP_ANY_DECK_OR_CHILD_LIMITS,
+    TOOLTIP_ANY_DECK_OR_CHILD_AVAIL,
+    TOOLTIP_ANY_CHILD_LIMITS,
+    TOOLTIP_ANY_CHILD_AVAIL,
+    TOOLTIP_ALL_CONTAINER_LIMITS,
+    TOOLTIP_ALL_CONTAINER_AVAIL,
+    TOOLTIP_ALL_DECK_AND_CHILDREN_LIMITS,
+    TOOLTIP_ALL_DECK_AND_CHILDREN_AVAIL,
+    TOOLTIP_ALL_CHILDREN_LIMITS,
+    TOOLTIP_ALL_CHILDREN_AVAIL,
+)
+TOOLTIP_TEMPLATE_IDS = {template: index for index, template in enumerate(TOOLTIP_TEMPLATES)}
+
+# Compact badges carry "template,own unsuspended,own suspended,subtree unsuspended,subtree
+# suspended" instead of a title; the tooltip is only built when a badge is hovered.
+COMPACT_BADGE_STYLE = """
+<style id="notify-empty-decks-style">
+.ned {
+  display: inline-flex;
+  align-items: center;
+  justify-content: center;
+  width: 1.15em;
+  height: 1.15em;
+  margin-left: 0.45em;
+  border-radius: 999px;
+  color: #fff;
+  font-size: 0.72em;
+  font-weight: 700;
+  line-height: 1;
+  vertical-align: middle;
+  box-shadow: inset 0 0 0 1px rgba(0, 0, 0, 0.08);
+  cursor: help;
+}
+
+.ned::after {
+  content: "!";
+}
+
+.ned-l {
+  background: #c0392b;
+}
+
+.ned-a {
+  background: #f39c12;
+}
+</style>
+"""
+
+COMPACT_TOOLTIP_JS = """
+<script>
+(function (templates) {
+  document.addEventListener("mouseover", function (event) {
+    var badge = event.target.closest ? event.target.closest(".ned") : null;
+    if (!badge || badge.title) {
+      return;
+    }
+    var fields = badge.getAttribute("data-ned").split(",");
+    badge.title = templates[fields[0]].replace(/\\{(\\d)\\}/g, function (_, index) {
+      return fields[Number(index) + 1];
+    });
+  });
+})(%s);
+</script>
+"""
+
+COMPACT_BADGE_HEAD = COMPACT_BADGE_STYLE + COMPACT_TOOLTIP_JS % json.dumps(TOOLTIP_TEMPLATES)
+
+
 DECK_LINK_RE = re.compile(
     r'(<a class="deck [^"]*"\s*href=# onclick="return pycmd\(\'open:(\d+)\'\)">.*?</a>)',
     re.DOTALL,
 )
 
-DEFAULT_CONFIG = {
-    "use_regex_patterns": False,
-    "include_patterns": [],
-    "exclude_patterns": [],
-    "container_deck_mode": CONTAINER_MODE_ANY,
-    "fractional_scheduler_health_override": False,
-}
+
+# Past this share of dirty decks a full rebuild is cheaper than patching the snapshot.
+INCREMENTAL_DIRTY_FRACTION = 0.25
+# How long the profile warm-up waits for the first deck-browser render to hand over its
+# due tree before building one itself.
+WARM_UP_TREE_WAIT_SECONDS = 10.0
+# Past this share of decks that need counting, one scan of the cards table is cheaper than
+# looking the decks up one by one.
+COUNT_ALL_DECKS_FRACTION = 0.5
+
+
+PATCH_BADGES_JS = """
+(function (badges, style) {
+  document.querySelectorAll(".notify-empty-decks-badge, .ned").forEach(function (badge) {
+    badge.remove();
+  });
+  if (!document.getElementById("notify-empty-decks-style")) {
+    document.body.insertAdjacentHTML("afterbegin", style);
+  }
+  document.querySelectorAll("a.deck").forEach(function (link) {
+    var match = /pycmd\\('open:(\\d+)'\\)/.exec(link.getAttribute("onclick") || "");
+    if (match && badges[match[1]]) {
+      link.insertAdjacentHTML("afterend", badges[match[1]]);
+    }
+  });
+})(%s, %s);
+"""
 
 _menu_action: Optional[QAction] = None
 _settings_dialog: Optional[QDialog] = None
+_config_cache: Optional[EffectiveConfig] = None
+_config_cache_stamp: Optional[Tuple[int, int]] = None
+_hierarchy_cache: Optional[DeckHierarchy] = None
+_status_generation = 0
+_due_tree_cache: Optional[Tuple[Tuple[int, int], object]] = None
+_status_snapshot: Optional[StatusSnapshot] = None
+_status_snapshot_lock = threading.Lock()
+_redo_available = False
 
 
-@dataclass
-class DeckInfo:
+class DeckEntry(NamedTuple):
     did: int
     name: str
     is_filtered: bool
-    total_cards: int
     new_limit: Optional[int]
     limit_source: str
+
+
+class BadgeSignature(NamedTuple):
+    container_mode: str
+    is_container: bool
+    direct_status: Optional[str]
+    descendant_status: Optional[str]
+    agg_status: Optional[str]
     unsuspended_new: int
     suspended_new: int
-    effective_new_count: int
-    self_status: str
-    is_container: bool = False
-    has_children: bool = False
-    monitored: bool = False
-    direct_status: Optional[str] = None
-    descendant_status: Optional[str] = None
-    has_monitored_descendants: bool = False
-    agg_status: Optional[str] = None
-    agg_unsuspended_new: int = 0
-    agg_suspended_new: int = 0
-    agg_has_monitored: bool = False
+    agg_unsuspended_new: int
+    agg_suspended_new: int
+
+
+# Collection mod, scheduler day, config fingerprint, Fractional Scheduler token and, with
+# lazy collapsed subtrees, which decks are collapsed.
+RenderCacheKey = Tuple[int, int, str, object, Optional[str]]
+
+
+@dataclass
+class RenderCache:
+    key: Optional[RenderCacheKey] = None
+    badges_by_did: Dict[int, str] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+    # Set while the badges are the ones persisted by the previous session.
+    restored: bool = False
+    computed_at: float = 0.0
+    coalesced: int = 0
+    trailing_refreshes: int = 0
+    # Computations skipped because a render reused the badges of an earlier one.
+    saved_computations: int = 0
+    # Renders coalesced since the last trailing step.
+    window_coalesced: int = 0
+    refresh_scheduled: bool = False
+
+    def clear(self) -> None:
+        self.key = None
+        self.badges_by_did = {}
+        self.restored = False
+        self.computed_at = 0.0
+
+    def store(self, key: Optional[RenderCacheKey], badges_by_did: Dict[int, str]) -> None:
+        self.key = key
+        self.badges_by_did = badges_by_did
+        self.computed_at = time.monotonic()
+
+
+_render_cache = RenderCache()
+
+
+@dataclass
+class WarmUpRun:
+    # The render cache key without the collapsed-deck token, which needs the due tree.
+    base_key: Tuple[int, int, str, object]
+    tree_ready: threading.Event = field(default_factory=threading.Event)
+    due_tree: Optional[object] = None
+    # The deck browser whose render is waiting for the warm-up's badges.
+    deck_browser: Optional[object] = None
+    render_key: Optional[RenderCacheKey] = None
+    cancelled: bool = False
+
+
+@dataclass
+class ProfileWarmUp:
+    started: int = 0
+    completed: int = 0
+    superseded: int = 0
+    joined: int = 0
+    last_seconds: Optional[float] = None
+    last_decks: int = 0
+    running: Optional[WarmUpRun] = None
+
+
+_profile_warm_up = ProfileWarmUp()
+
+
+@dataclass(slots=True)
+class StatusInputs:
+    effective_new_counts: Dict[int, int]
+    card_counts: Dict[int, Tuple[int, int, int]]
+    fractional_positive: FrozenSet[int]
+    scanned_at: int
+    # None when every deck was counted.
+    counted_dids: Optional[FrozenSet[int]] = None
+    # Cards in the decks that were not counted, or None if unknown.
+    uncounted_total: Optional[int] = 0
+    # Collapsed decks in the due tree; only collected for lazy collapsed subtrees.
+    collapsed_dids: FrozenSet[int] = frozenset()
+
+
+@dataclass
+class StatusSnapshot:
+    structure_key: Tuple[int, str]
+    mod: int
+    infos: List[DeckInfo]
+    hierarchy: DeckHierarchy
+    totals: RollupTotals
+    inputs: StatusInputs
+    slot_by_did: Dict[int, int]
+    card_total: int
+    badges_by_did: Dict[int, str]
+    hidden: Dict[int, HiddenDeck] = field(default_factory=dict)
+
+
+@dataclass
+class PendingChanges:
+    full_rebuild: bool = True
+    cards: bool = False
+    mod: Optional[int] = None
+
+    def take(self) -> PendingChanges:
+        taken = PendingChanges(self.full_rebuild, self.cards, self.mod)
+        self.full_rebuild = False
+        self.cards = False
+        return taken
+
+    def restore(self, taken: PendingChanges) -> None:
+        # Hands back changes a computation took but never applied.
+        self.full_rebuild |= taken.full_rebuild
+        self.cards |= taken.cards
+
+
+_pending_changes = PendingChanges()
+
+
+@dataclass
+class BadgeComputation:
+    # Everything a computation produces for the shared caches. Background computations
+    # build it off the main thread and only publish it from their done callback.
+    badges_by_did: Dict[int, str]
+    snapshot: Optional[StatusSnapshot] = None
+    hierarchy: Optional[DeckHierarchy] = None
+    due_tree: Optional[Tuple[Tuple[int, int], object]] = None
+
+
+@dataclass
+class FractionalHealthCache:
+    api: Optional[object] = None
+    subscribed: bool = False
+    notifications: int = 0
+    token: Optional[object] = None
+    checked: Set[int] = field(default_factory=set)
+    positive: Set[int] = field(default_factory=set)
+    complete: bool = False
+    fetches: int = 0
+    reuses: int = 0
+
+    def reset(self) -> None:
+        self.token = None
+        self.checked = set()
+        self.positive = set()
+        self.complete = False
+
+
+_fractional_health = FractionalHealthCache()
+
+
+@dataclass
+class StatusExport:
+    content_hash: Optional[str] = None
+    writes: int = 0
+    unchanged: int = 0
+
+
+_status_export = StatusExport()
+_status_export_lock = threading.Lock()
+
+
+@dataclass
+class CollectionAccessStats:
+    calls: Dict[str, int] = field(default_factory=dict)
+    seconds: Dict[str, float] = field(default_factory=dict)
+    slow: int = 0
+
+
+_collection_access = CollectionAccessStats()
+_collection_access_lock = threading.Lock()
+# The render job whose collection calls are being counted on this thread.
+_collection_access_scope = threading.local()
+_slow_query_logger: Optional[logging.Logger] = None
+_fractional_health_lock = threading.Lock()
 
 
 def _load_config() -> dict:
-    config = dict(DEFAULT_CONFIG)
+    loaded = None
     try:
         with open(CONFIG_PATH, "r", encoding="utf-8") as handle:
             loaded = json.load(handle)
-        if isinstance(loaded, dict):
-            config.update(loaded)
     except Exception:
         pass
-
-    config["use_regex_patterns"] = bool(config.get("use_regex_patterns", False))
-    config["include_patterns"] = _normalize_pattern_list(config.get("include_patterns", []))
-    config["exclude_patterns"] = _normalize_pattern_list(config.get("exclude_patterns", []))
-    config["fractional_scheduler_health_override"] = bool(
-        config.get("fractional_scheduler_health_override", False)
-    )
-    container_mode = str(config.get("container_deck_mode", CONTAINER_MODE_ANY))
-    if container_mode == "aggregate_children":
-        container_mode = CONTAINER_MODE_ANY
-    if container_mode not in {choice[0] for choice in CONTAINER_MODE_CHOICES}:
-        container_mode = CONTAINER_MODE_ANY
-    config["container_deck_mode"] = container_mode
-    return config
+    return _normalize_config(loaded)
 
 
 def _save_config(config: dict) -> None:
@@ -143,75 +512,93 @@ def _save_config(config: dict) -> None:
             json.dump(config, handle, indent=2, sort_keys=False)
     except Exception:
         pass
+    _invalidate_config_cache()
 
 
-def _normalize_pattern_list(value: object) -> List[str]:
-    if isinstance(value, str):
-        items = value.splitlines()
-    elif isinstance(value, list):
-        items = [str(item) for item in value]
-    else:
-        return []
-
-    patterns: List[str] = []
-    for item in items:
-        pattern = item.strip()
-        if pattern and not pattern.startswith("#"):
-            patterns.append(pattern)
-    return patterns
-
-
-def _validate_patterns(patterns: List[str], use_regex: bool, label: str) -> Optional[str]:
-    if not use_regex:
+def _config_file_stamp() -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(CONFIG_PATH)
+    except OSError:
         return None
-    for pattern in patterns:
-        try:
-            re.compile(pattern, re.IGNORECASE)
-        except re.error as err:
-            return f"Invalid {label} regex `{pattern}`: {err}"
-    return None
+    return stat.st_mtime_ns, stat.st_size
 
 
-def _matches_any_pattern(name: str, patterns: List[str], use_regex: bool) -> bool:
-    if not patterns:
-        return False
-
-    if use_regex:
-        for pattern in patterns:
-            try:
-                if re.search(pattern, name, re.IGNORECASE):
-                    return True
-            except re.error:
-                continue
-        return False
+def _get_config() -> EffectiveConfig:
+    global _config_cache, _config_cache_stamp
+    stamp = _config_file_stamp()
+    if _config_cache is not None and stamp == _config_cache_stamp:
+        return _config_cache
 
-    lowered_name = name.lower()
-    for pattern in patterns:
-        if fnmatch.fnmatchcase(lowered_name, pattern.lower()):
-            return True
-    return False
+    _config_cache = _build_effective_config(_load_config())
+    _config_cache_stamp = stamp
+    return _config_cache
 
 
-def _should_monitor_deck(info: DeckInfo, config: dict) -> bool:
-    if info.is_filtered:
-        return False
+def _invalidate_config_cache() -> None:
+    global _config_cache, _config_cache_stamp
+    _config_cache = None
+    _config_cache_stamp = None
 
-    use_regex = bool(config.get("use_regex_patterns", False))
-    include_patterns = config.get("include_patterns", [])
-    exclude_patterns = config.get("exclude_patterns", [])
 
-    included = True
-    if include_patterns:
-        included = _matches_any_pattern(info.name, include_patterns, use_regex)
-    if not included:
-        return False
-    if exclude_patterns and _matches_any_pattern(info.name, exclude_patterns, use_regex):
-        return False
-    return True
+def _get_slow_query_logger() -> logging.Logger:
+    global _slow_query_logger
+    if _slow_query_logger is None:
+        logger = logging.getLogger(f"{__name__}.slow_queries")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        try:
+            handler = RotatingFileHandler(
+                SLOW_QUERY_LOG_PATH,
+                maxBytes=SLOW_QUERY_LOG_BYTES,
+                backupCount=SLOW_QUERY_LOG_BACKUPS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+        except Exception:
+            logger.addHandler(logging.NullHandler())
+        _slow_query_logger = logger
+    return _slow_query_logger
+
+
+def _record_collection_call(
+    kind: str, seconds: float, args: Tuple, operation: Optional[str]
+) -> None:
+    with _collection_access_lock:
+        _collection_access.calls[kind] = _collection_access.calls.get(kind, 0) + 1
+        _collection_access.seconds[kind] = _collection_access.seconds.get(kind, 0.0) + seconds
+    job = getattr(_collection_access_scope, "job", None)
+    if job is not None:
+        job.query_count += 1
+        job.query_seconds += seconds
+
+    # Read the cached config directly; stat-ing the config file on every call would cost
+    # more than most of the calls being measured.
+    config = _config_cache
+    if config is None or not config.slow_query_ms or seconds * 1000 < config.slow_query_ms:
+        return
+    with _collection_access_lock:
+        _collection_access.slow += 1
+    detail = operation
+    if detail is None:
+        detail = " ".join(" ".join(str(arg).split()) for arg in args)
+    try:
+        _get_slow_query_logger().info(
+            "%.1f ms %s %s", seconds * 1000, kind, detail[:SLOW_QUERY_DETAIL_CHARS]
+        )
+    except Exception:
+        pass
 
 
-def _is_problematic(info: DeckInfo) -> bool:
-    return info.agg_status in (STATUS_LIMITS, STATUS_AVAIL)
+def _collection_call(kind: str, fn: Callable, *args, operation: Optional[str] = None):
+    # Every collection and backend access goes through here, so each render can report
+    # how many calls it made and slow ones end up in the log with their SQL. Calls whose
+    # arguments say nothing useful, like the collection object, name their operation.
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        _record_collection_call(kind, time.perf_counter() - started, args, operation)
 
 
 def _get_deck_config(did: int) -> dict:
@@ -225,115 +612,265 @@ def _get_deck_config(did: int) -> dict:
         fn = getattr(decks, attr, None)
         if callable(fn):
             try:
-                return fn(did)
+                return _collection_call(f"decks.{attr}", fn, did)
             except Exception:
                 continue
 
-    deck = decks.get(did)
+    deck = _collection_call("decks.get", decks.get, did)
     if deck:
         conf_id = deck.get("conf")
         if conf_id is not None:
             fn = getattr(decks, "get_config", None)
             if callable(fn):
                 try:
-                    return fn(conf_id)
+                    return _collection_call("decks.get_config", fn, conf_id)
                 except Exception:
                     pass
 
     return {}
 
 
-def _get_config_new_limit(did: int) -> Tuple[Optional[int], str]:
-    deck = mw.col.decks.get(did) or {}
-    for key in ("new_per_day", "newPerDay", "newLimit", "new_limit"):
-        if key in deck:
-            try:
-                return int(deck[key]), "deck"
-            except Exception:
-                pass
-
-    limits = deck.get("limits")
-    if isinstance(limits, dict):
-        for key in ("new", "perDay", "new_per_day"):
-            if key in limits:
-                try:
-                    return int(limits[key]), "deck"
-                except Exception:
-                    pass
+def _prefetch_preset_new_limits() -> Dict[int, Optional[int]]:
+    all_config = getattr(mw.col.decks, "all_config", None)
+    if not callable(all_config):
+        return {}
+    try:
+        presets = _collection_call("decks.all_config", all_config)
+    except Exception:
+        return {}
 
-    config = _get_deck_config(did)
-    per_day = config.get("new", {}).get("perDay")
+    limits: Dict[int, Optional[int]] = {}
+    for preset in presets or []:
+        try:
+            limits[int(preset["id"])] = _preset_new_limit(preset)
+        except Exception:
+            continue
+    return limits
+
+
+def _get_config_new_limit(
+    did: int,
+    deck: Optional[dict] = None,
+    preset_limits: Optional[Dict[int, Optional[int]]] = None,
+) -> Tuple[Optional[int], str]:
+    if deck is None:
+        deck = _collection_call("decks.get", mw.col.decks.get, did) or {}
+    deck_limit = _deck_new_limit_override(deck)
+    if deck_limit is not None:
+        return deck_limit, "deck"
+
+    conf_id = deck.get("conf")
+    if preset_limits is not None and conf_id is not None and conf_id in preset_limits:
+        per_day = preset_limits[conf_id]
+    else:
+        per_day = _preset_new_limit(_get_deck_config(did))
     if per_day is None:
         return None, "unknown"
+    return per_day, "config"
 
+
+def _count_cards_by_deck() -> Dict[int, Tuple[int, int, int]]:
+    counts: Dict[int, Tuple[int, int, int]] = {}
     try:
-        return int(per_day), "config"
+        rows = _collection_call("db.all", mw.col.db.all, CARD_COUNTS_SQL)
     except Exception:
-        return None, "unknown"
+        return counts
+
+    for home_did, total, unsuspended_new, suspended_new in rows:
+        try:
+            counts[int(home_did)] = (
+                int(total or 0),
+                int(unsuspended_new or 0),
+                int(suspended_new or 0),
+            )
+        except Exception:
+            continue
+    return counts
 
 
-def _count_new_cards(did: int, suspended: bool) -> int:
-    queue = -1 if suspended else 0
+def _count_all_cards(dids: Optional[FrozenSet[int]] = None) -> Optional[int]:
+    sql = "select count() from cards"
+    if dids is not None:
+        if not dids:
+            return 0
+        id_list = ",".join(str(did) for did in dids)
+        # Cards by home deck: the cards sitting in the decks (a covering index scan),
+        # corrected by the usually few cards that are in filtered decks.
+        sql = (
+            f"select (select count() from cards where did in ({id_list})) + "
+            f"(select ifnull(sum(odid in ({id_list})) - sum(did in ({id_list})), 0) "
+            "from cards where odid != 0)"
+        )
     try:
-        count = mw.col.db.scalar(
-            "select count() from cards where did=? and type=0 and queue=?",
-            did,
-            queue,
+        return int(_collection_call("db.scalar", mw.col.db.scalar, sql))
+    except Exception:
+        return None
+
+
+def _find_changed_decks(since: int) -> Optional[Set[int]]:
+    try:
+        return set(
+            _collection_call(
+                "db.list",
+                mw.col.db.list,
+                "select distinct (case when odid then odid else did end) from cards where mod >= ?",
+                since,
+            )
+        )
+    except Exception:
+        return None
+
+
+def _recount_decks(dids: Set[int]) -> Optional[Dict[int, Tuple[int, int, int]]]:
+    counts: Dict[int, Tuple[int, int, int]] = {did: (0, 0, 0) for did in dids}
+    if not dids:
+        return counts
+    id_list = ",".join(str(did) for did in dids)
+    try:
+        rows = _collection_call(
+            "db.all",
+            mw.col.db.all,
+            "select (case when odid then odid else did end) as home_did, count(), "
+            "sum(type=0 and queue=0), sum(type=0 and queue=-1) "
+            f"from cards where did in ({id_list}) or (odid != 0 and odid in ({id_list})) "
+            "group by home_did",
         )
-        return int(count or 0)
     except Exception:
-        return 0
+        return None
 
+    for home_did, total, unsuspended_new, suspended_new in rows:
+        # Cards found through their current filtered deck may belong to another home deck.
+        if home_did in counts:
+            counts[home_did] = (
+                int(total or 0),
+                int(unsuspended_new or 0),
+                int(suspended_new or 0),
+            )
+    return counts
 
-def _count_total_cards(did: int) -> int:
+
+def _collection_state_key() -> Optional[Tuple[int, int]]:
     try:
-        count = mw.col.db.scalar("select count() from cards where did=?", did)
-        return int(count or 0)
+        # Both are backend round trips: col.mod is read from the col table.
+        mod = _collection_call("col.mod", lambda: mw.col.mod)
+        today = _collection_call("sched.today", lambda: mw.col.sched.today)
+        return int(mod), int(today)
     except Exception:
-        return 0
+        return None
 
 
-def _build_effective_new_count_map() -> Dict[int, int]:
+def _deck_browser_due_tree(deck_browser) -> Optional[object]:
+    # The deck browser has just built this tree for the page we decorate.
+    render_data = getattr(deck_browser, "_render_data", None)
+    return getattr(render_data, "tree", None)
+
+
+def _load_deck_due_tree(state_key: Optional[Tuple[int, int]]) -> Optional[object]:
+    # Safe off the main thread: it reads the cached tree but never replaces it.
+    cached = _due_tree_cache
+    if state_key is not None and cached is not None and cached[0] == state_key:
+        return cached[1]
+    try:
+        return _collection_call("sched.deck_due_tree", mw.col.sched.deck_due_tree)
+    except Exception:
+        return None
+
+
+def _get_deck_due_tree(deck_browser=None) -> Optional[object]:
+    global _due_tree_cache
+    state_key = _collection_state_key()
+    tree = _deck_browser_due_tree(deck_browser)
+    if tree is None:
+        tree = _load_deck_due_tree(state_key)
+        if tree is None:
+            return None
+    _due_tree_cache = (state_key, tree) if state_key is not None else None
+    return tree
+
+
+def _build_effective_new_count_map(
+    tree: Optional[object], collapsed: Optional[Set[int]] = None
+) -> Dict[int, int]:
     counts: Dict[int, int] = {}
+    if tree is None:
+        return counts
 
-    def visit(node) -> None:
+    stack = [tree]
+    while stack:
+        node = stack.pop()
         deck_id = getattr(node, "deck_id", None)
+        children = getattr(node, "children", None)
         if deck_id is not None:
             try:
                 counts[int(deck_id)] = int(getattr(node, "new_count", 0) or 0)
+                if collapsed is not None and children and getattr(node, "collapsed", False):
+                    collapsed.add(int(deck_id))
             except Exception:
                 pass
-        for child in getattr(node, "children", []) or []:
-            visit(child)
+        if children:
+            stack.extend(children)
+    return counts
 
-    try:
-        tree = mw.col.sched.deck_due_tree()
-    except Exception:
-        return counts
 
-    visit(tree)
-    return counts
+def _fractional_health_token(api: object) -> Optional[object]:
+    if _fractional_health.subscribed:
+        # Notifications stand in for a version token, so the API is never polled.
+        return ("notified", _fractional_health.notifications)
+    for attr in ("get_schedule_health_version", "get_schedule_health_generation"):
+        fn = getattr(api, attr, None)
+        if callable(fn):
+            try:
+                return _collection_call(
+                    f"fractional.{attr}", fn, mw.col, operation="fractional_health_token"
+                )
+            except Exception:
+                return None
+    return None
 
 
-def _get_fractional_schedule_health_snapshot(config: dict) -> Dict[int, object]:
-    if not config.get("fractional_scheduler_health_override", False):
-        return {}
-    if not mw or not mw.col:
-        return {}
+def _subscribe_fractional_health(api: object) -> bool:
+    for attr in ("subscribe_schedule_health_changes", "register_schedule_health_listener"):
+        fn = getattr(api, attr, None)
+        if callable(fn):
+            try:
+                fn(_on_fractional_health_changed)
+                return True
+            except Exception:
+                continue
+    return False
+
+
+def _fetch_fractional_health(api: object, dids: Set[int]) -> Optional[Tuple[dict, bool]]:
+    batched = getattr(api, "get_schedule_health_for_decks", None)
+    if callable(batched):
+        try:
+            entries = _collection_call(
+                "fractional.get_schedule_health_for_decks",
+                batched,
+                mw.col,
+                sorted(dids),
+                operation=f"fractional_positive_dids ({len(dids)} decks)",
+            )
+        except Exception:
+            entries = None
+        if isinstance(entries, dict):
+            return entries, False
 
-    api = getattr(mw, "fractional_scheduler_api", None)
     getter = getattr(api, "get_schedule_health_snapshot", None)
     if not callable(getter):
-        return {}
-
+        return None
     try:
-        snapshot = getter(mw.col)
+        snapshot = _collection_call(
+            "fractional.get_schedule_health_snapshot",
+            getter,
+            mw.col,
+            operation="fractional_positive_dids (snapshot)",
+        )
     except Exception:
-        return {}
-
+        return None
     if not isinstance(snapshot, dict):
-        return {}
-    return snapshot
+        return None
+    return snapshot, True
 
 
 def _fractional_snapshot_is_future_positive(entry: object) -> bool:
@@ -342,54 +879,150 @@ def _fractional_snapshot_is_future_positive(entry: object) -> bool:
     return bool(getattr(entry, "has_future_positive_limit", False))
 
 
-def _compute_self_status(
-    new_limit: Optional[int], unsuspended_new: int, effective_new_count: int
-) -> str:
-    if effective_new_count > 0:
-        return STATUS_NORMAL
-    if new_limit is not None and new_limit <= 0 and unsuspended_new > 0:
-        return STATUS_LIMITS
-    if unsuspended_new <= 0:
-        return STATUS_AVAIL
-    return STATUS_NORMAL
+def _get_deck_hierarchy(names: Tuple[str, ...]) -> DeckHierarchy:
+    # A new hierarchy only replaces the cached one when its computation is published.
+    cached = _hierarchy_cache
+    if cached is None or cached.key != names:
+        return DeckHierarchy(names)
+    return cached
 
 
-def _parent_name(deck_name: str) -> Optional[str]:
-    if "::" not in deck_name:
+def _fractional_positive_dids(config: EffectiveConfig, candidates: Set[int]) -> FrozenSet[int]:
+    if not config.fractional_scheduler_health_override or not candidates:
+        return frozenset()
+    if not mw or not mw.col:
+        return frozenset()
+    api = getattr(mw, "fractional_scheduler_api", None)
+    if api is None:
+        return frozenset()
+
+    cache = _fractional_health
+    with _fractional_health_lock:
+        if api is not cache.api:
+            cache.api = api
+            cache.subscribed = _subscribe_fractional_health(api)
+            cache.reset()
+        token = _fractional_health_token(api)
+        if token is None or token != cache.token:
+            cache.reset()
+            cache.token = token
+
+        missing = set() if cache.complete else candidates - cache.checked
+        if missing:
+            fetched = _fetch_fractional_health(api, missing)
+            if fetched is None:
+                cache.reset()
+                return frozenset()
+            entries, cache.complete = fetched
+            cache.fetches += 1
+            cache.checked |= missing
+            for did, entry in entries.items():
+                try:
+                    did = int(did)
+                except Exception:
+                    continue
+                if _fractional_snapshot_is_future_positive(entry):
+                    cache.positive.add(did)
+                else:
+                    cache.positive.discard(did)
+        else:
+            cache.reuses += 1
+        return frozenset(cache.positive & candidates)
+
+
+def _fractional_render_token(config: EffectiveConfig) -> Optional[object]:
+    if not config.fractional_scheduler_health_override:
         return None
-    return deck_name.rsplit("::", 1)[0]
+    api = getattr(mw, "fractional_scheduler_api", None)
+    if api is None or api is not _fractional_health.api:
+        return None
+    with _fractional_health_lock:
+        return _fractional_health_token(api)
+
+
+def _fractional_candidate_dids(card_counts: Dict[int, Tuple[int, int, int]]) -> Set[int]:
+    # Only decks with unsuspended new cards are ever overridden to healthy.
+    return {did for did, counts in card_counts.items() if counts[1] > 0}
+
+
+def _collect_status_inputs(
+    config: EffectiveConfig,
+    due_tree: Optional[object],
+    job: RenderJob,
+    counted_dids: Optional[FrozenSet[int]] = None,
+) -> StatusInputs:
+    if due_tree is None:
+        due_tree = _load_deck_due_tree(_collection_state_key())
+    collapsed: Optional[Set[int]] = set() if config.lazy_collapsed_subtrees else None
+    effective_new_counts = _build_effective_new_count_map(due_tree, collapsed)
+    job.lap("due_tree")
+    job.check_cancelled()
+    # Cards modified from this second on are picked up by the next incremental scan.
+    scanned_at = int(time.time())
+    uncounted_total: Optional[int] = 0
+    if counted_dids is None:
+        card_counts = _count_cards_by_deck()
+    else:
+        card_counts = _recount_decks(set(counted_dids)) or {}
+        collection_total = _count_all_cards()
+        uncounted_total = None
+        if collection_total is not None:
+            uncounted_total = collection_total - sum(counts[0] for counts in card_counts.values())
+    job.lap("counts")
+    job.check_cancelled()
+    return StatusInputs(
+        effective_new_counts=effective_new_counts,
+        card_counts=card_counts,
+        fractional_positive=_fractional_positive_dids(
+            config, _fractional_candidate_dids(card_counts)
+        ),
+        scanned_at=scanned_at,
+        counted_dids=counted_dids,
+        uncounted_total=uncounted_total,
+        collapsed_dids=frozenset(collapsed or ()),
+    )
 
 
-def _build_deck_info(config: dict) -> Tuple[Dict[str, DeckInfo], List[str]]:
-    decks_manager = mw.col.decks
-    effective_new_counts = _build_effective_new_count_map()
-    fractional_health = _get_fractional_schedule_health_snapshot(config)
-    deck_items = []
+def _deck_items(decks_manager) -> Iterable:
+    # Full deck dicts come first because they already carry everything a row needs;
+    # the lighter listings are fallbacks for older Anki versions.
+    try:
+        deck_items = _collection_call("decks.all", decks_manager.all)
+    except Exception:
+        deck_items = []
+    if deck_items:
+        return deck_items
     all_names = getattr(decks_manager, "all_names_and_ids", None)
     if callable(all_names):
         try:
-            deck_items = all_names()
+            deck_items = _collection_call("decks.all_names_and_ids", all_names)
         except Exception:
             deck_items = []
-    if not deck_items:
-        deck_items = decks_manager.all()
-    if not deck_items:
-        all_ids = getattr(decks_manager, "all_ids", None)
-        if callable(all_ids):
-            try:
-                deck_items = all_ids()
-            except Exception:
-                deck_items = []
+    if deck_items:
+        return deck_items
+    all_ids = getattr(decks_manager, "all_ids", None)
+    if callable(all_ids):
+        try:
+            return _collection_call("decks.all_ids", all_ids)
+        except Exception:
+            pass
+    return []
 
-    info_by_name: Dict[str, DeckInfo] = {}
-    deck_names: List[str] = []
 
-    for deck in deck_items:
+def _list_decks() -> List[DeckEntry]:
+    decks_manager = mw.col.decks
+    preset_limits = _prefetch_preset_new_limits()
+    entries: List[DeckEntry] = []
+    # Each deck dict is reduced to the fields the pipeline needs as soon as it is read,
+    # so no deck dict outlives this loop.
+    for deck in _deck_items(decks_manager):
         did = None
         name = None
+        deck_dict = None
         if isinstance(deck, dict):
             did = deck.get("id")
             name = deck.get("name")
+            deck_dict = deck
         elif isinstance(deck, (list, tuple)) and len(deck) >= 2:
             if isinstance(deck[0], int):
                 did = deck[0]
@@ -406,264 +1039,200 @@ def _build_deck_info(config: dict) -> Tuple[Dict[str, DeckInfo], List[str]]:
             name_fn = getattr(decks_manager, "name", None)
             if callable(name_fn):
                 try:
-                    name = name_fn(did)
+                    name = _collection_call("decks.name", name_fn, did)
                 except Exception:
                     name = None
 
         if did is None or not name:
             continue
 
-        deck_dict = decks_manager.get(did)
-        is_filtered = bool(deck_dict.get("dyn", False)) if deck_dict else False
-        new_limit, limit_source = _get_config_new_limit(did)
-        unsuspended_new = _count_new_cards(did, suspended=False)
-        suspended_new = _count_new_cards(did, suspended=True)
+        if deck_dict is None:
+            deck_dict = _collection_call("decks.get", decks_manager.get, did) or {}
+        new_limit, limit_source = _get_config_new_limit(did, deck_dict, preset_limits)
+        entries.append(
+            DeckEntry(did, name, bool(deck_dict.get("dyn", False)), new_limit, limit_source)
+        )
+    # Sorted rows with unique names are already in hierarchy slot order. Anki keeps names
+    # unique, but a damaged collection may not, so only the first deck of a name is kept.
+    entries.sort(key=lambda entry: entry.name)
+    return [
+        entry
+        for index, entry in enumerate(entries)
+        if index == 0 or entries[index - 1].name != entry.name
+    ]
+
+
+def _counted_deck_ids(decks: List[DeckEntry], config: EffectiveConfig) -> Optional[FrozenSet[int]]:
+    counted = _select_counted_decks(
+        ((entry.did, entry.name, entry.is_filtered) for entry in decks), config
+    )
+    if len(counted) > len(decks) * COUNT_ALL_DECKS_FRACTION:
+        return None
+    return frozenset(counted)
+
+
+def _build_deck_info(
+    config: EffectiveConfig,
+    due_tree: Optional[object] = None,
+    job: Optional[RenderJob] = None,
+    inputs: Optional[StatusInputs] = None,
+    decks: Optional[List[DeckEntry]] = None,
+    hidden: Optional[Dict[int, HiddenDeck]] = None,
+) -> Tuple[List[DeckInfo], DeckHierarchy]:
+    if job is None:
+        job = RenderJob()
+    if decks is None:
+        decks = _list_decks()
+        job.lap("decks")
+    if inputs is None:
+        counted_dids = _counted_deck_ids(decks, config)
+        job.lap("matching")
+        inputs = _collect_status_inputs(config, due_tree, job, counted_dids)
+    effective_new_counts = inputs.effective_new_counts
+    card_counts = inputs.card_counts
+    fractional_positive = inputs.fractional_positive
+    counted_dids = inputs.counted_dids
+    # Decks under a collapsed row are not rendered, so with lazy collapsed subtrees they
+    # are reduced to their share of that row's rollup instead of getting a DeckInfo.
+    collapsed_dids = inputs.collapsed_dids if hidden is not None else frozenset()
+    collapsed_slots: Dict[str, int] = {}
+    hidden_by_name: Dict[str, HiddenDeck] = {}
+
+    infos: List[DeckInfo] = []
+    for did, name, is_filtered, new_limit, limit_source in decks:
+        total_cards, unsuspended_new, suspended_new = card_counts.get(int(did), (0, 0, 0))
         effective_new_count = effective_new_counts.get(int(did), 0)
         self_status = _compute_self_status(new_limit, unsuspended_new, effective_new_count)
-        if unsuspended_new > 0 and _fractional_snapshot_is_future_positive(
-            fractional_health.get(int(did))
-        ):
+        if unsuspended_new > 0 and int(did) in fractional_positive:
             self_status = STATUS_NORMAL
 
-        info_by_name[name] = DeckInfo(
-            did=did,
-            name=name,
-            is_filtered=is_filtered,
-            total_cards=_count_total_cards(did),
-            new_limit=new_limit,
-            limit_source=limit_source,
-            unsuspended_new=unsuspended_new,
-            suspended_new=suspended_new,
-            effective_new_count=effective_new_count,
-            self_status=self_status,
-        )
-        deck_names.append(name)
-
-    parents = set()
-    for name in deck_names:
-        parent = _parent_name(name)
-        while parent:
-            parents.add(parent)
-            parent = _parent_name(parent)
-    for name, info in info_by_name.items():
-        info.has_children = name in parents
-        info.is_container = info.total_cards == 0 and name in parents
-
-    return info_by_name, deck_names
-
-
-def _apply_monitoring(info_by_name: Dict[str, DeckInfo], deck_names: List[str], config: dict) -> None:
-    container_mode = config.get("container_deck_mode", CONTAINER_MODE_ANY)
-    agg_unsuspended: Dict[str, int] = {}
-    agg_suspended: Dict[str, int] = {}
-    subtree_monitored_counts: Dict[str, int] = {}
-    subtree_problem_counts: Dict[str, int] = {}
-    subtree_any_limits: Dict[str, bool] = {}
-    subtree_any_avail: Dict[str, bool] = {}
-    descendant_monitored_counts: Dict[str, int] = {}
-    descendant_problem_counts: Dict[str, int] = {}
-    descendant_any_limits: Dict[str, bool] = {}
-    descendant_any_avail: Dict[str, bool] = {}
-
-    for name, info in info_by_name.items():
-        info.monitored = _should_monitor_deck(info, config)
-        info.direct_status = info.self_status if info.monitored and not info.is_container else None
-        info.descendant_status = None
-        info.has_monitored_descendants = False
-        agg_unsuspended[name] = info.unsuspended_new if info.monitored else 0
-        agg_suspended[name] = info.suspended_new if info.monitored else 0
-        direct_problem = info.direct_status in (STATUS_LIMITS, STATUS_AVAIL)
-        subtree_monitored_counts[name] = 1 if info.monitored and not info.is_container else 0
-        subtree_problem_counts[name] = 1 if direct_problem else 0
-        subtree_any_limits[name] = info.direct_status == STATUS_LIMITS
-        subtree_any_avail[name] = info.direct_status == STATUS_AVAIL
-        descendant_monitored_counts[name] = 0
-        descendant_problem_counts[name] = 0
-        descendant_any_limits[name] = False
-        descendant_any_avail[name] = False
-
-    if container_mode == CONTAINER_MODE_DIRECT:
-        for name, info in info_by_name.items():
-            info.agg_has_monitored = subtree_monitored_counts.get(name, 0) > 0
-            info.agg_unsuspended_new = agg_unsuspended.get(name, 0)
-            info.agg_suspended_new = agg_suspended.get(name, 0)
-            info.agg_status = info.direct_status
-        return
-
-    for name in sorted(deck_names, key=lambda item: item.count("::"), reverse=True):
-        parent = _parent_name(name)
-        if not parent or parent not in info_by_name:
-            continue
-        agg_unsuspended[parent] = agg_unsuspended.get(parent, 0) + agg_unsuspended.get(name, 0)
-        agg_suspended[parent] = agg_suspended.get(parent, 0) + agg_suspended.get(name, 0)
-        descendant_monitored_counts[parent] += subtree_monitored_counts.get(name, 0)
-        descendant_problem_counts[parent] += subtree_problem_counts.get(name, 0)
-        descendant_any_limits[parent] = descendant_any_limits.get(parent, False) or subtree_any_limits.get(
-            name, False
-        )
-        descendant_any_avail[parent] = descendant_any_avail.get(parent, False) or subtree_any_avail.get(
-            name, False
-        )
-        subtree_monitored_counts[parent] += subtree_monitored_counts.get(name, 0)
-        subtree_problem_counts[parent] += subtree_problem_counts.get(name, 0)
-        subtree_any_limits[parent] = subtree_any_limits.get(parent, False) or subtree_any_limits.get(
-            name, False
-        )
-        subtree_any_avail[parent] = subtree_any_avail.get(parent, False) or subtree_any_avail.get(
-            name, False
+        if collapsed_dids:
+            # Parents sort before their children, so a parent is always placed first.
+            parent_name = _parent_name(name)
+            parent = hidden_by_name.get(parent_name) if parent_name is not None else None
+            owner = parent.owner if parent is not None else collapsed_slots.get(parent_name or "")
+            if owner is not None:
+                if parent is not None:
+                    parent.has_children = True
+                hidden_by_name[name] = HiddenDeck(
+                    owner=owner,
+                    new_limit=new_limit,
+                    monitored=_should_monitor(name, is_filtered, config),
+                    total_cards=total_cards,
+                    unsuspended_new=unsuspended_new,
+                    suspended_new=suspended_new,
+                    self_status=self_status,
+                )
+                if hidden is not None:
+                    hidden[int(did)] = hidden_by_name[name]
+                continue
+            if int(did) in collapsed_dids:
+                collapsed_slots[name] = len(infos)
+
+        infos.append(
+            DeckInfo(
+                did=did,
+                name=name,
+                is_filtered=is_filtered,
+                total_cards=total_cards,
+                new_limit=new_limit,
+                limit_source=limit_source,
+                unsuspended_new=unsuspended_new,
+                suspended_new=suspended_new,
+                effective_new_count=effective_new_count,
+                self_status=self_status,
+                counts_known=counted_dids is None or int(did) in counted_dids,
+            )
         )
 
-    for name, info in info_by_name.items():
-        info.has_monitored_descendants = descendant_monitored_counts.get(name, 0) > 0
-        info.agg_has_monitored = subtree_monitored_counts.get(name, 0) > 0
-        info.agg_unsuspended_new = agg_unsuspended.get(name, 0)
-        info.agg_suspended_new = agg_suspended.get(name, 0)
-
-        if container_mode in {CONTAINER_MODE_ANY, CONTAINER_MODE_HIDE}:
-            if descendant_any_limits.get(name, False):
-                info.descendant_status = STATUS_LIMITS
-            elif descendant_any_avail.get(name, False):
-                info.descendant_status = STATUS_AVAIL
-        elif container_mode == CONTAINER_MODE_ALL:
-            descendant_monitored = descendant_monitored_counts.get(name, 0)
-            descendant_problematic = descendant_problem_counts.get(name, 0)
-            if descendant_monitored > 0 and descendant_monitored == descendant_problematic:
-                if descendant_any_limits.get(name, False):
-                    info.descendant_status = STATUS_LIMITS
-                elif descendant_any_avail.get(name, False):
-                    info.descendant_status = STATUS_AVAIL
-
-        if info.direct_status == STATUS_LIMITS or info.descendant_status == STATUS_LIMITS:
-            info.agg_status = STATUS_LIMITS
-        elif info.direct_status == STATUS_AVAIL or info.descendant_status == STATUS_AVAIL:
-            info.agg_status = STATUS_AVAIL
-        else:
-            info.agg_status = None
-
+    hierarchy = _get_deck_hierarchy(tuple(info.name for info in infos))
+    _link_deck_infos(infos, hierarchy)
+    for deck in hidden_by_name.values():
+        deck.contribution = _hidden_deck_contribution(deck)
+        owner_info = infos[deck.owner]
+        owner_info.has_children = True
+        owner_info.is_container = owner_info.counts_known and owner_info.total_cards == 0
 
-def _should_show_badge(info: DeckInfo, config: dict) -> bool:
-    if not _is_problematic(info):
-        return False
-    container_mode = config.get("container_deck_mode", CONTAINER_MODE_ANY)
-    if info.is_container and container_mode in {CONTAINER_MODE_HIDE, CONTAINER_MODE_DIRECT}:
-        return False
-    return True
+    job.deck_count = len(infos)
+    job.hidden_deck_count = len(hidden_by_name)
+    job.uncounted_deck_count = sum(not info.counts_known for info in infos)
+    job.lap("decks")
+    return infos, hierarchy
 
 
-def _badge_tooltip(info: DeckInfo, config: dict) -> str:
-    container_mode = config.get("container_deck_mode", CONTAINER_MODE_ANY)
+def _badge_tooltip_template(info: BadgeSignature) -> str:
+    container_mode = info.container_mode
     if container_mode == CONTAINER_MODE_DIRECT:
         if info.direct_status == STATUS_LIMITS:
-            return (
-                "This deck is blocked by a 0/day new-card limit. "
-                f"Unsuspended new: {info.unsuspended_new}. "
-                f"Suspended new: {info.suspended_new}."
-            )
-        return (
-            "This deck has 0 unsuspended new cards available. "
-            f"Suspended new: {info.suspended_new}."
-        )
+            return TOOLTIP_DECK_LIMITS
+        return TOOLTIP_DECK_AVAIL
 
     if container_mode in {CONTAINER_MODE_ANY, CONTAINER_MODE_HIDE}:
         if info.is_container:
             if info.agg_status == STATUS_LIMITS:
-                return (
-                    "At least one included child deck under this container is blocked by a "
-                    "0/day new-card limit. "
-                    f"Unsuspended new in the included subtree: {info.agg_unsuspended_new}. "
-                    f"Suspended new in the included subtree: {info.agg_suspended_new}."
-                )
-            return (
-                "At least one included child deck under this container has 0 unsuspended "
-                "new cards available. "
-                f"Suspended new in the included subtree: {info.agg_suspended_new}."
-            )
+                return TOOLTIP_ANY_CONTAINER_LIMITS
+            return TOOLTIP_ANY_CONTAINER_AVAIL
         if info.direct_status and info.descendant_status:
             if info.agg_status == STATUS_LIMITS:
-                return (
-                    "This deck or at least one included child deck is blocked by a 0/day "
-                    "new-card limit. "
-                    f"Unsuspended new in the included subtree: {info.agg_unsuspended_new}. "
-                    f"Suspended new in the included subtree: {info.agg_suspended_new}."
-                )
-            return (
-                "This deck or at least one included child deck has 0 unsuspended new cards "
-                "available. "
-                f"Suspended new in the included subtree: {info.agg_suspended_new}."
-            )
+                return TOOLTIP_ANY_DECK_OR_CHILD_LIMITS
+            return TOOLTIP_ANY_DECK_OR_CHILD_AVAIL
         if info.direct_status == STATUS_LIMITS:
-            return (
-                "This deck is blocked by a 0/day new-card limit. "
-                f"Unsuspended new: {info.unsuspended_new}. "
-                f"Suspended new: {info.suspended_new}."
-            )
+            return TOOLTIP_DECK_LIMITS
         if info.direct_status == STATUS_AVAIL:
-            return (
-                "This deck has 0 unsuspended new cards available. "
-                f"Suspended new: {info.suspended_new}."
-            )
+            return TOOLTIP_DECK_AVAIL
         if info.descendant_status == STATUS_LIMITS:
-            return (
-                "At least one included child deck is blocked by a 0/day new-card limit. "
-                f"Unsuspended new in the included subtree: {info.agg_unsuspended_new}. "
-                f"Suspended new in the included subtree: {info.agg_suspended_new}."
-            )
-        return (
-            "At least one included child deck has 0 unsuspended new cards available. "
-            f"Suspended new in the included subtree: {info.agg_suspended_new}."
-        )
+            return TOOLTIP_ANY_CHILD_LIMITS
+        return TOOLTIP_ANY_CHILD_AVAIL
 
     if info.is_container:
         if info.agg_status == STATUS_LIMITS:
-            return (
-                "All included child decks under this container are blocked, and at least "
-                "one of them is blocked by a 0/day new-card limit. "
-                f"Unsuspended new in the included subtree: {info.agg_unsuspended_new}. "
-                f"Suspended new in the included subtree: {info.agg_suspended_new}."
-            )
-        return (
-            "All included child decks under this container have 0 unsuspended new cards "
-            "available. "
-            f"Suspended new in the included subtree: {info.agg_suspended_new}."
-        )
+            return TOOLTIP_ALL_CONTAINER_LIMITS
+        return TOOLTIP_ALL_CONTAINER_AVAIL
     if info.direct_status and info.descendant_status:
         if info.agg_status == STATUS_LIMITS:
-            return (
-                "This deck is blocked, and all included child decks are also blocked; at "
-                "least one of them is blocked by a 0/day new-card limit. "
-                f"Unsuspended new in the included subtree: {info.agg_unsuspended_new}. "
-                f"Suspended new in the included subtree: {info.agg_suspended_new}."
-            )
-        return (
-            "This deck is blocked, and all included child decks also have 0 unsuspended "
-            "new cards available. "
-            f"Suspended new in the included subtree: {info.agg_suspended_new}."
-        )
+            return TOOLTIP_ALL_DECK_AND_CHILDREN_LIMITS
+        return TOOLTIP_ALL_DECK_AND_CHILDREN_AVAIL
     if info.direct_status == STATUS_LIMITS:
-        return (
-            "This deck is blocked by a 0/day new-card limit. "
-            f"Unsuspended new: {info.unsuspended_new}. "
-            f"Suspended new: {info.suspended_new}."
-        )
+        return TOOLTIP_DECK_LIMITS
     if info.direct_status == STATUS_AVAIL:
-        return (
-            "This deck has 0 unsuspended new cards available. "
-            f"Suspended new: {info.suspended_new}."
-        )
+        return TOOLTIP_DECK_AVAIL
     if info.agg_status == STATUS_LIMITS:
-        return (
-            "All included child decks are blocked, and at least one of them is blocked by "
-            "a 0/day new-card limit. "
-            f"Unsuspended new in the included subtree: {info.agg_unsuspended_new}. "
-            f"Suspended new in the included subtree: {info.agg_suspended_new}."
-        )
-    return (
-        "All included child decks have 0 unsuspended new cards available. "
-        f"Suspended new in the included subtree: {info.agg_suspended_new}."
+        return TOOLTIP_ALL_CHILDREN_LIMITS
+    return TOOLTIP_ALL_CHILDREN_AVAIL
+
+
+def _badge_tooltip(info: BadgeSignature) -> str:
+    return _badge_tooltip_template(info).format(
+        info.unsuspended_new, info.suspended_new, info.agg_unsuspended_new, info.agg_suspended_new
+    )
+
+
+def _badge_signature(info: DeckInfo, config: EffectiveConfig) -> BadgeSignature:
+    return BadgeSignature(
+        config.container_deck_mode,
+        info.is_container,
+        info.direct_status,
+        info.descendant_status,
+        info.agg_status,
+        info.unsuspended_new,
+        info.suspended_new,
+        info.agg_unsuspended_new,
+        info.agg_suspended_new,
     )
 
 
-def _render_badge_html(info: DeckInfo, config: dict) -> str:
+def _render_badge_html(info: DeckInfo, config: EffectiveConfig) -> str:
+    return _render_badge_for_config(_badge_signature(info, config), config)
+
+
+def _render_badge_for_config(info: BadgeSignature, config: EffectiveConfig) -> str:
+    if config.compact_tooltips:
+        return _render_compact_badge_for_signature(info)
+    return _render_badge_for_signature(info)
+
+
+@functools.lru_cache(maxsize=BADGE_CACHE_SIZE)
+def _render_badge_for_signature(info: BadgeSignature) -> str:
     if info.agg_status == STATUS_LIMITS:
         badge_class = "notify-empty-decks-badge notify-empty-decks-badge-limits"
         label = "0/day new-card limit"
@@ -671,41 +1240,1025 @@ def _render_badge_html(info: DeckInfo, config: dict) -> str:
         badge_class = "notify-empty-decks-badge notify-empty-decks-badge-availability"
         label = "No unsuspended new cards available"
 
-    tooltip = escape(_badge_tooltip(info, config), quote=True)
+    tooltip = escape(_badge_tooltip(info), quote=True)
     aria_label = escape(label, quote=True)
     return f'<span class="{badge_class}" title="{tooltip}" aria-label="{aria_label}">!</span>'
 
 
-def _inject_badges(tree_html: str, badges_by_did: Dict[int, str]) -> str:
+@functools.lru_cache(maxsize=BADGE_CACHE_SIZE)
+def _render_compact_badge_for_signature(info: BadgeSignature) -> str:
+    status_code = "l" if info.agg_status == STATUS_LIMITS else "a"
+    template_id = TOOLTIP_TEMPLATE_IDS[_badge_tooltip_template(info)]
+    fields = (
+        f"{template_id},{info.unsuspended_new},{info.suspended_new},"
+        f"{info.agg_unsuspended_new},{info.agg_suspended_new}"
+    )
+    return f'<span class="ned ned-{status_code}" data-ned="{fields}"></span>'
+
+
+def _inject_badges(tree_html: str, badges_by_did: Dict[int, str], style: str = BADGE_STYLE) -> str:
+    if not badges_by_did:
+        return tree_html
+
     def repl(match: re.Match[str]) -> str:
         badge = badges_by_did.get(int(match.group(2)))
         if not badge:
             return match.group(1)
         return f"{match.group(1)}{badge}"
 
-    return DECK_LINK_RE.sub(repl, tree_html)
+    return style + DECK_LINK_RE.sub(repl, tree_html)
 
 
-def _decorate_deck_browser(deck_browser, content) -> None:
-    if not mw or not mw.col:
-        return
+def _collapsed_deck_ids(tree: Optional[object]) -> Set[int]:
+    collapsed: Set[int] = set()
+    stack: List[Any] = [tree] if tree is not None else []
+    while stack:
+        node = stack.pop()
+        children = getattr(node, "children", None)
+        if children:
+            if getattr(node, "collapsed", False):
+                collapsed.add(int(node.deck_id))
+            stack.extend(children)
+    return collapsed
 
-    config = _load_config()
-    info_by_name, deck_names = _build_deck_info(config)
-    if not info_by_name:
-        return
 
-    _apply_monitoring(info_by_name, deck_names, config)
+def _collapsed_decks_token(collapsed_dids: Iterable[int]) -> str:
+    payload = ",".join(str(did) for did in sorted(collapsed_dids))
+    return hashlib.sha1(payload.encode("ascii")).hexdigest()
+
+
+def _render_cache_base_key(config: EffectiveConfig) -> Optional[Tuple[int, int, str, object]]:
+    state_key = _collection_state_key()
+    if state_key is None:
+        return None
+    return state_key[0], state_key[1], config.fingerprint, _fractional_render_token(config)
+
+
+def _render_cache_key(
+    config: EffectiveConfig,
+    due_tree: Optional[object] = None,
+    base_key: Optional[Tuple[int, int, str, object]] = None,
+) -> Optional[RenderCacheKey]:
+    if base_key is None:
+        base_key = _render_cache_base_key(config)
+        if base_key is None:
+            return None
+    # Expanding or collapsing a deck re-renders the page before col.mod changes, so with
+    # lazy collapsed subtrees the rows on screen have to be part of the key.
+    collapsed_token = None
+    if config.lazy_collapsed_subtrees:
+        if due_tree is None:
+            due_tree = _get_deck_due_tree()
+        collapsed_token = _collapsed_decks_token(_collapsed_deck_ids(due_tree))
+    return base_key + (collapsed_token,)
+
+
+def _take_status_snapshot() -> Optional[StatusSnapshot]:
+    global _status_snapshot
+    # The snapshot is patched in place, so it is held by one computation at a time and
+    # only published again once that computation has finished.
+    with _status_snapshot_lock:
+        snapshot, _status_snapshot = _status_snapshot, None
+    return snapshot
+
+
+def _publish_status_snapshot(snapshot: StatusSnapshot) -> None:
+    global _status_snapshot
+    with _status_snapshot_lock:
+        _status_snapshot = snapshot
+
+
+def _can_update_incrementally(
+    snapshot: StatusSnapshot,
+    pending: PendingChanges,
+    config: EffectiveConfig,
+    state_key: Optional[Tuple[int, int]],
+) -> bool:
+    if state_key is None or pending.full_rebuild:
+        return False
+    mod, today = state_key
+    if snapshot.structure_key != (today, config.fingerprint):
+        return False
+    # Every change since the snapshot must have been reported by an operation; anything
+    # else may have touched decks or presets behind our back.
+    return mod in (snapshot.mod, pending.mod)
+
+
+def _update_status_snapshot(
+    snapshot: StatusSnapshot,
+    pending: PendingChanges,
+    config: EffectiveConfig,
+    due_tree: Optional[object],
+    job: RenderJob,
+) -> bool:
+    inputs = snapshot.inputs
+    if due_tree is None:
+        due_tree = _load_deck_due_tree(_collection_state_key())
+    collapsed: Optional[Set[int]] = set() if config.lazy_collapsed_subtrees else None
+    effective_new_counts = _build_effective_new_count_map(due_tree, collapsed)
+    # Expanding or collapsing a deck changes which rows need full detail.
+    if collapsed is not None and collapsed != inputs.collapsed_dids:
+        return False
+    deck_total = len(snapshot.infos) + len(snapshot.hidden)
+    previous_effective = inputs.effective_new_counts
+    dirty = {
+        did
+        for did in effective_new_counts.keys() | previous_effective.keys()
+        if effective_new_counts.get(did, 0) != previous_effective.get(did, 0)
+    }
+    job.lap("due_tree")
+    job.check_cancelled()
+
+    card_counts = inputs.card_counts
+    card_total = snapshot.card_total
+    uncounted_total = inputs.uncounted_total
+    scanned_at = inputs.scanned_at
+    if pending.cards:
+        scanned_at = int(time.time())
+        changed = _find_changed_decks(inputs.scanned_at)
+        if changed is None:
+            return False
+        uncounted_changed = False
+        if inputs.counted_dids is not None:
+            uncounted_changed = not changed <= inputs.counted_dids
+            changed &= inputs.counted_dids
+        if len(changed) > deck_total * INCREMENTAL_DIRTY_FRACTION:
+            return False
+        recounted = _recount_decks(changed)
+        if recounted is None:
+            return False
+        for did, counts in recounted.items():
+            card_total += counts[0] - card_counts.get(did, (0, 0, 0))[0]
+        # Deleted cards and the old deck of moved cards leave no trace in cards.mod, but
+        # both leave the per-deck totals adding up to more than the counted decks hold.
+        collection_total = _count_all_cards()
+        if collection_total is None:
+            return False
+        if uncounted_total is None or uncounted_changed:
+            # Cards also moved in or out of uncounted decks, so count the counted decks.
+            if card_total != _count_all_cards(inputs.counted_dids):
+                return False
+            uncounted_total = collection_total - card_total
+        elif card_total != collection_total - uncounted_total:
+            return False
+        card_counts.update(recounted)
+        dirty |= changed
+    job.lap("counts")
+    job.check_cancelled()
+
+    fractional_positive = _fractional_positive_dids(config, _fractional_candidate_dids(card_counts))
+    dirty |= fractional_positive ^ inputs.fractional_positive
+    if len(dirty) > deck_total * INCREMENTAL_DIRTY_FRACTION:
+        return False
+
+    infos = snapshot.infos
+    totals = snapshot.totals
+    parents = snapshot.hierarchy.parent
+    touched: Set[int] = set()
+    for did in dirty:
+        slot = snapshot.slot_by_did.get(did)
+        if slot is None:
+            hidden_deck = snapshot.hidden.get(did)
+            if hidden_deck is None:
+                continue
+            before = hidden_deck.contribution
+            hidden_deck.total_cards, hidden_deck.unsuspended_new, hidden_deck.suspended_new = (
+                card_counts.get(did, (0, 0, 0))
+            )
+            hidden_deck.self_status = _compute_self_status(
+                hidden_deck.new_limit,
+                hidden_deck.unsuspended_new,
+                effective_new_counts.get(did, 0),
+            )
+            if hidden_deck.unsuspended_new > 0 and did in fractional_positive:
+                hidden_deck.self_status = STATUS_NORMAL
+            hidden_deck.contribution = _hidden_deck_contribution(hidden_deck)
+            if totals.rolled_up and hidden_deck.contribution != before:
+                delta = tuple(new - old for new, old in zip(hidden_deck.contribution, before))
+                _apply_rollup_delta(
+                    totals, parents, hidden_deck.owner, delta, touched, from_descendant=True
+                )
+            continue
+        info = infos[slot]
+        before = _rollup_contribution(info)
+        info.total_cards, info.unsuspended_new, info.suspended_new = card_counts.get(
+            did, (0, 0, 0)
+        )
+        info.effective_new_count = effective_new_counts.get(did, 0)
+        info.self_status = _compute_self_status(
+            info.new_limit, info.unsuspended_new, info.effective_new_count
+        )
+        if info.unsuspended_new > 0 and did in fractional_positive:
+            info.self_status = STATUS_NORMAL
+        info.is_container = info.counts_known and info.total_cards == 0 and info.has_children
+        info.direct_status = info.self_status if info.monitored and not info.is_container else None
+        touched.add(slot)
+        after = _rollup_contribution(info)
+        if after != before:
+            delta = tuple(new - old for new, old in zip(after, before))
+            _apply_rollup_delta(totals, parents, slot, delta, touched)
+    job.lap("rollup")
+
+    _derive_rollup_statuses(infos, touched, totals, config.container_deck_mode)
+    badges_by_did = snapshot.badges_by_did
+    for slot in touched:
+        info = infos[slot]
+        if _should_show_badge(info, config):
+            badges_by_did[info.did] = _render_badge_html(info, config)
+        else:
+            badges_by_did.pop(info.did, None)
+
+    inputs.effective_new_counts = effective_new_counts
+    inputs.fractional_positive = fractional_positive
+    inputs.scanned_at = scanned_at
+    inputs.uncounted_total = uncounted_total
+    snapshot.card_total = card_total
+    job.incremental = True
+    job.deck_count = len(infos)
+    job.updated_deck_count = len(touched)
+    return True
+
+
+def _compute_status(
+    config: EffectiveConfig,
+    due_tree: Optional[object],
+    job: RenderJob,
+    pending: PendingChanges,
+) -> BadgeComputation:
+    # Runs on any thread: the shared caches are only read here, and everything new goes
+    # into the returned computation.
+    state_key = _collection_state_key()
+    if due_tree is None:
+        due_tree = _load_deck_due_tree(state_key)
+    due_tree_entry = None
+    if state_key is not None and due_tree is not None:
+        due_tree_entry = (state_key, due_tree)
+    # Taking the snapshot keeps it from every other computation, so stop before that.
+    job.check_cancelled()
+    snapshot = _take_status_snapshot()
+    if (
+        snapshot is not None
+        and _can_update_incrementally(snapshot, pending, config, state_key)
+        and _update_status_snapshot(snapshot, pending, config, due_tree, job)
+    ):
+        if state_key is not None:
+            snapshot.mod = state_key[0]
+        if config.export_status_json:
+            _export_statuses(snapshot.infos, config)
+            job.lap("export")
+        badges_by_did = dict(snapshot.badges_by_did)
+        job.badge_count = len(badges_by_did)
+        job.lap("badges")
+        return BadgeComputation(badges_by_did, snapshot, due_tree=due_tree_entry)
+
+    decks = _list_decks()
+    job.lap("decks")
+    counted_dids = _counted_deck_ids(decks, config)
+    job.lap("matching")
+    inputs = _collect_status_inputs(config, due_tree, job, counted_dids)
+    hidden: Dict[int, HiddenDeck] = {}
+    infos, hierarchy = _build_deck_info(config, due_tree, job, inputs, decks, hidden)
+    if not infos:
+        return BadgeComputation({}, due_tree=due_tree_entry)
+
+    job.check_cancelled()
+    totals = _apply_monitoring(infos, hierarchy, config, job, hidden.values())
+    job.check_cancelled()
 
     badges_by_did = {
         info.did: _render_badge_html(info, config)
-        for info in info_by_name.values()
+        for info in infos
         if _should_show_badge(info, config)
     }
+    job.badge_count = len(badges_by_did)
+    job.lap("badges")
+    if config.export_status_json:
+        _export_statuses(infos, config)
+        job.lap("export")
+    new_snapshot = None
+    if state_key is not None:
+        new_snapshot = StatusSnapshot(
+            structure_key=(state_key[1], config.fingerprint),
+            mod=state_key[0],
+            infos=infos,
+            hierarchy=hierarchy,
+            totals=totals,
+            inputs=inputs,
+            slot_by_did={int(info.did): slot for slot, info in enumerate(infos)},
+            card_total=sum(counts[0] for counts in inputs.card_counts.values()),
+            badges_by_did=dict(badges_by_did),
+            hidden=hidden,
+        )
+    return BadgeComputation(badges_by_did, new_snapshot, hierarchy, due_tree_entry)
+
+
+def _publish_badge_computation(computation: BadgeComputation) -> None:
+    global _due_tree_cache, _hierarchy_cache
+    # Main thread only, so a cancelled or superseded computation never touches the caches.
+    if computation.snapshot is not None:
+        _publish_status_snapshot(computation.snapshot)
+    if computation.hierarchy is not None:
+        _hierarchy_cache = computation.hierarchy
+    if computation.due_tree is not None:
+        _due_tree_cache = computation.due_tree
+
+
+def _compute_badges(
+    config: EffectiveConfig,
+    due_tree: Optional[object] = None,
+    job: Optional[RenderJob] = None,
+) -> Dict[int, str]:
+    if job is None:
+        job = RenderJob()
+    pending = _pending_changes.take()
+    try:
+        computation = _compute_status(config, due_tree, job, pending)
+    except Exception:
+        _pending_changes.restore(pending)
+        raise
+    _publish_badge_computation(computation)
+    return computation.badges_by_did
+
+
+def _compute_badges_in_background(
+    config: EffectiveConfig,
+    due_tree: Optional[object],
+    pending: PendingChanges,
+    should_cancel: Callable[[], bool],
+) -> BadgeComputation:
+    job = RenderJob(should_cancel, background=True)
+    _collection_access_scope.job = job
+    try:
+        computation = _compute_status(config, due_tree, job, pending)
+    finally:
+        _collection_access_scope.job = None
+    job.finish()
+    return computation
+
+
+def _patch_deck_browser_badges(
+    deck_browser, badges_by_did: Dict[int, str], config: EffectiveConfig
+) -> None:
+    if getattr(mw, "state", None) != "deckBrowser":
+        return
+    web = getattr(deck_browser, "web", None)
+    if web is None:
+        return
+
+    payload = json.dumps({str(did): badge for did, badge in badges_by_did.items()})
+    # The tooltip script of compact badges is already in the page head.
+    style = COMPACT_BADGE_STYLE if config.compact_tooltips else BADGE_STYLE
+    web.eval(PATCH_BADGES_JS % (payload, json.dumps(style)))
+
+
+def _start_background_computation(
+    deck_browser, config: EffectiveConfig, cache_key: Optional[RenderCacheKey]
+) -> bool:
+    global _status_generation
+    taskman = getattr(mw, "taskman", None)
+    if taskman is None:
+        return False
+
+    # Bumping the generation cancels any computation still running for an older render.
+    _status_generation += 1
+    generation = _status_generation
+
+    def is_superseded() -> bool:
+        return generation != _status_generation
+
+    def on_done(future) -> None:
+        try:
+            computation = future.result()
+        except Exception:
+            _pending_changes.restore(pending)
+            return
+        if is_superseded():
+            _pending_changes.restore(pending)
+            return
+        _publish_badge_computation(computation)
+        _render_cache.store(cache_key, computation.badges_by_did)
+        _patch_deck_browser_badges(deck_browser, computation.badges_by_did, config)
+
+    due_tree = _deck_browser_due_tree(deck_browser)
+    pending = _pending_changes.take()
+    taskman.run_in_background(
+        lambda: _compute_badges_in_background(config, due_tree, pending, is_superseded),
+        on_done,
+    )
+    return True
+
+
+def _start_profile_warm_up() -> bool:
+    global _status_generation
+    taskman = getattr(mw, "taskman", None)
+    if taskman is None:
+        return False
+
+    # Loading the config compiles the matchers; the computation builds the hierarchy index
+    # and the status snapshot for the first deck-browser render.
+    config = _get_config()
+    base_key = _render_cache_base_key(config)
+    if base_key is None:
+        return False
+    _status_generation += 1
+    generation = _status_generation
+    run = _profile_warm_up.running = WarmUpRun(base_key)
+    job = RenderJob(lambda: run.cancelled or generation != _status_generation, background=True)
+    # Opening a profile already queued the first deck-browser render, which builds its
+    # own due tree; the warm-up waits for that tree instead of building a second one.
+    wait_for_render = getattr(mw, "state", None) == "deckBrowser"
+
+    def warm_up() -> Tuple[BadgeComputation, float, Optional[RenderCacheKey]]:
+        if wait_for_render:
+            run.tree_ready.wait(WARM_UP_TREE_WAIT_SECONDS)
+        job.check_cancelled()
+        started = time.perf_counter()
+        _collection_access_scope.job = job
+        try:
+            due_tree = run.due_tree
+            if due_tree is None:
+                due_tree = _load_deck_due_tree(_collection_state_key())
+            cache_key = _render_cache_key(config, due_tree, base_key)
+            computation = _compute_status(config, due_tree, job, pending)
+        finally:
+            _collection_access_scope.job = None
+        return computation, time.perf_counter() - started, cache_key
+
+    def on_done(future) -> None:
+        if _profile_warm_up.running is run:
+            _profile_warm_up.running = None
+        try:
+            computation, seconds, cache_key = future.result()
+        except StatusComputationCancelled:
+            # The collection changed or the profile closed before the warm-up finished.
+            _profile_warm_up.superseded += 1
+            _pending_changes.restore(pending)
+            return
+        except Exception:
+            _pending_changes.restore(pending)
+            return
+        _profile_warm_up.completed += 1
+        _profile_warm_up.last_seconds = seconds
+        _profile_warm_up.last_decks = job.deck_count
+        if generation != _status_generation:
+            _profile_warm_up.superseded += 1
+            _pending_changes.restore(pending)
+            return
+        _publish_badge_computation(computation)
+        badges_by_did = computation.badges_by_did
+        _render_cache.store(cache_key, badges_by_did)
+        _render_cache.restored = False
+        if run.deck_browser is None:
+            return
+        # A render went ahead while the warm-up was running and left the badges to it.
+        if run.render_key == cache_key:
+            _patch_deck_browser_badges(run.deck_browser, badges_by_did, config)
+        else:
+            _refresh_deck_browser()
+
+    _profile_warm_up.started += 1
+    pending = _pending_changes.take()
+    taskman.run_in_background(warm_up, on_done)
+    return True
+
+
+def _cancel_profile_warm_up() -> None:
+    run = _profile_warm_up.running
+    if run is not None:
+        run.cancelled = True
+        run.tree_ready.set()
+
+
+def _join_profile_warm_up(deck_browser, cache_key: Optional[RenderCacheKey]) -> bool:
+    run = _profile_warm_up.running
+    if run is None:
+        return False
+    if cache_key is None or cache_key[:4] != run.base_key:
+        # The collection or config changed since the profile opened, so the warm-up's
+        # badges would be stale; let it stop instead of waiting for a tree.
+        _cancel_profile_warm_up()
+        return False
+    if not run.tree_ready.is_set():
+        run.due_tree = _deck_browser_due_tree(deck_browser)
+        run.tree_ready.set()
+    run.deck_browser = deck_browser
+    run.render_key = cache_key
+    _profile_warm_up.joined += 1
+    return True
+
+
+def _read_exported_hash() -> str:
+    try:
+        with open(STATUS_EXPORT_PATH, "r", encoding="utf-8") as handle:
+            return str(json.load(handle).get("hash", ""))
+    except Exception:
+        return ""
+
+
+def _export_statuses(infos: List[DeckInfo], config: EffectiveConfig) -> None:
+    # A deck whose cards were never counted has no own status or counts to report.
+    rows = [
+        [
+            int(info.did),
+            info.name,
+            info.monitored,
+            info.counts_known,
+            info.self_status if info.counts_known else None,
+            info.direct_status,
+            info.descendant_status,
+            info.agg_status,
+            info.unsuspended_new if info.counts_known else None,
+            info.suspended_new if info.counts_known else None,
+            info.agg_unsuspended_new,
+            info.agg_suspended_new,
+        ]
+        for info in infos
+    ]
+    body = json.dumps(
+        {
+            "container_deck_mode": config.container_deck_mode,
+            "fields": STATUS_EXPORT_FIELDS,
+            "decks": rows,
+        },
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    content_hash = hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+    with _status_export_lock:
+        if _status_export.content_hash is None:
+            _status_export.content_hash = _read_exported_hash()
+        if content_hash == _status_export.content_hash:
+            _status_export.unchanged += 1
+            return
+
+        # The hash only covers the statuses, so an unchanged file is never rewritten.
+        header = json.dumps(
+            {
+                "format": STATUS_EXPORT_FORMAT,
+                "addon_version": ADDON_VERSION,
+                "hash": content_hash,
+                "written_at": int(time.time()),
+            },
+            separators=(",", ":"),
+        )
+        temp_path = f"{STATUS_EXPORT_PATH}.tmp"
+        try:
+            os.makedirs(os.path.dirname(STATUS_EXPORT_PATH), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                handle.write(f"{header[:-1]},{body[1:]}\n")
+            # Readers polling the file only ever see a complete export.
+            os.replace(temp_path, STATUS_EXPORT_PATH)
+        except Exception:
+            return
+        _status_export.content_hash = content_hash
+        _status_export.writes += 1
+
+
+def _persisted_status_path() -> Optional[str]:
+    collection_path = getattr(mw.col, "path", None)
+    if not collection_path:
+        return None
+    digest = hashlib.sha1(os.path.abspath(collection_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(USER_FILES_DIR, f"status-{digest}.sqlite3")
+
+
+def _save_persisted_status(snapshot: StatusSnapshot, config: EffectiveConfig) -> None:
+    path = _persisted_status_path()
+    today, fingerprint = snapshot.structure_key
+    if path is None or fingerprint != config.fingerprint:
+        return
+
+    rows = []
+    for info in snapshot.infos:
+        if not info.counts_known or int(info.did) not in snapshot.badges_by_did:
+            continue
+        signature = _badge_signature(info, config)
+        rows.append((int(info.did),) + tuple(signature[1:]))
+    meta = {
+        "format": PERSISTED_STATUS_FORMAT,
+        "addon_version": ADDON_VERSION,
+        "mod": snapshot.mod,
+        "today": today,
+        "fingerprint": fingerprint,
+        "collapsed": (
+            _collapsed_decks_token(snapshot.inputs.collapsed_dids)
+            if config.lazy_collapsed_subtrees
+            else None
+        ),
+    }
+
+    temp_path = f"{path}.tmp"
+    try:
+        os.makedirs(USER_FILES_DIR, exist_ok=True)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        connection = sqlite3.connect(temp_path)
+        try:
+            with connection:
+                connection.execute("create table meta (key text primary key, value)")
+                connection.execute(
+                    "create table badges (did integer primary key, is_container integer, "
+                    "direct_status text, descendant_status text, agg_status text, "
+                    "unsuspended_new integer, suspended_new integer, "
+                    "agg_unsuspended_new integer, agg_suspended_new integer)"
+                )
+                connection.executemany("insert into meta values (?, ?)", meta.items())
+                connection.executemany(
+                    "insert into badges values (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+        finally:
+            connection.close()
+        # Readers only ever see a complete file.
+        os.replace(temp_path, path)
+    except Exception:
+        pass
+
+
+def _load_persisted_status(
+    config: EffectiveConfig,
+) -> Optional[Tuple[RenderCacheKey, Dict[int, str]]]:
+    path = _persisted_status_path()
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            meta = dict(connection.execute("select key, value from meta").fetchall())
+            rows = connection.execute("select * from badges").fetchall()
+        finally:
+            connection.close()
+    except Exception:
+        return None
+
+    if (
+        meta.get("format") != PERSISTED_STATUS_FORMAT
+        or meta.get("addon_version") != ADDON_VERSION
+        or meta.get("fingerprint") != config.fingerprint
+    ):
+        return None
+
+    badges_by_did: Dict[int, str] = {}
+    for did, is_container, *fields in rows:
+        signature = BadgeSignature(config.container_deck_mode, bool(is_container), *fields)
+        badges_by_did[int(did)] = _render_badge_for_config(signature, config)
+    # Fractional Scheduler health is not persisted, so with the override on the restored
+    # badges are only shown while fresh ones are computed.
+    token = "restored" if config.fractional_scheduler_health_override else None
+    key = (int(meta["mod"]), int(meta["today"]), config.fingerprint, token, meta.get("collapsed"))
+    return key, badges_by_did
+
+
+def _restore_persisted_status() -> None:
+    restored = _load_persisted_status(_get_config())
+    if restored is None:
+        return
+    _render_cache.key, _render_cache.badges_by_did = restored
+    _render_cache.restored = True
+
+
+def _schedule_trailing_refresh(delay_ms: int) -> bool:
+    progress = getattr(mw, "progress", None)
+    single_shot = getattr(progress, "single_shot", None)
+    try:
+        if callable(single_shot):
+            single_shot(delay_ms, _on_trailing_refresh, False)
+        else:
+            QTimer.singleShot(delay_ms, _on_trailing_refresh)
+    except Exception:
+        return False
+    return True
+
+
+def _on_trailing_refresh() -> None:
+    _render_cache.refresh_scheduled = False
+    _render_cache.trailing_refreshes += 1
+    # Each render coalesced into this window skipped its own computation; the trailing
+    # step stands in for at most one of them.
+    coalesced, _render_cache.window_coalesced = _render_cache.window_coalesced, 0
+    if _refresh_coalesced_badges():
+        coalesced -= 1
+    _render_cache.saved_computations += max(0, coalesced)
+
+
+def _refresh_coalesced_badges() -> bool:
+    global _status_generation
+    deck_browser = getattr(mw, "deckBrowser", None)
+    if not mw or not mw.col or deck_browser is None or getattr(mw, "state", None) != "deckBrowser":
+        return False
+
+    # Only the badges of the last coalesced page can be stale, so they are recomputed and
+    # patched in place instead of re-rendering the whole deck list.
+    config = _get_config()
+    cache_key = _render_cache_key(config, _deck_browser_due_tree(deck_browser))
+    if cache_key is not None and cache_key == _render_cache.key:
+        return False
+    if config.async_status_computation and _start_background_computation(
+        deck_browser, config, cache_key
+    ):
+        return True
+
+    job = RenderJob()
+    _status_generation += 1
+    _collection_access_scope.job = job
+    try:
+        badges_by_did = _compute_badges(config, _get_deck_due_tree(deck_browser), job)
+    finally:
+        _collection_access_scope.job = None
+        job.finish()
+    _render_cache.store(cache_key, badges_by_did)
+    _patch_deck_browser_badges(deck_browser, badges_by_did, config)
+    return True
+
+
+def _coalesce_refresh(config: EffectiveConfig, cache_key: Optional[RenderCacheKey]) -> bool:
+    # A refresh shortly after a computation reuses its badges; one trailing step at the
+    # end of the window then patches in whatever changed in between.
+    last_key = _render_cache.key
+    if not config.refresh_coalesce_ms or cache_key is None or last_key is None:
+        return False
+    if last_key[1:3] != cache_key[1:3] or last_key[4] != cache_key[4]:
+        return False
+    elapsed_ms = (time.monotonic() - _render_cache.computed_at) * 1000
+    if elapsed_ms >= config.refresh_coalesce_ms:
+        return False
+    if not _render_cache.refresh_scheduled:
+        delay_ms = max(1, int(config.refresh_coalesce_ms - elapsed_ms) + 1)
+        if not _schedule_trailing_refresh(delay_ms):
+            return False
+        _render_cache.refresh_scheduled = True
+    return True
+
+
+def _decorate_deck_browser(deck_browser, content) -> None:
+    if not mw or not mw.col:
+        return
+
+    job = RenderJob()
+    # Collection calls made on this thread until the render finishes are charged to it.
+    _collection_access_scope.job = job
+    try:
+        _decorate_deck_browser_content(deck_browser, content, job)
+    finally:
+        _collection_access_scope.job = None
+        job.finish()
+
+
+def _decorate_deck_browser_content(deck_browser, content, job: RenderJob) -> None:
+    global _status_generation
+    config = _get_config()
+    cache_key = _render_cache_key(config, _deck_browser_due_tree(deck_browser))
+    job.lap("config")
+    # Badges persisted by the previous session are only used for the first render.
+    restored = job.restored = _render_cache.restored
+    _render_cache.restored = False
+    if cache_key is not None and cache_key == _render_cache.key:
+        _render_cache.hits += 1
+        _status_generation += 1
+        job.cache_hit = True
+        badges_by_did = _render_cache.badges_by_did
+    elif _coalesce_refresh(config, cache_key):
+        _render_cache.coalesced += 1
+        _render_cache.window_coalesced += 1
+        job.coalesced = True
+        badges_by_did = _render_cache.badges_by_did
+    elif _join_profile_warm_up(deck_browser, cache_key) or (
+        (config.async_status_computation or restored)
+        and _start_background_computation(deck_browser, config, cache_key)
+    ):
+        # The badges are patched in once the warm-up or background computation is done.
+        _render_cache.misses += 1
+        # Show the last known badges while the fresh ones are computed, unless they
+        # were computed for a different configuration.
+        last_key = _render_cache.key
+        if last_key is None or last_key[2] != config.fingerprint:
+            return
+        badges_by_did = _render_cache.badges_by_did
+    else:
+        _render_cache.misses += 1
+        _status_generation += 1
+        badges_by_did = _compute_badges(config, _get_deck_due_tree(deck_browser), job)
+        _render_cache.store(cache_key, badges_by_did)
+    job.badge_count = len(badges_by_did)
     if not badges_by_did:
         return
 
-    content.tree = BADGE_STYLE + _inject_badges(content.tree, badges_by_did)
+    # Compact badges get their stylesheet once per page, from the page head.
+    style = "" if config.compact_tooltips else BADGE_STYLE
+    content.tree = _inject_badges(content.tree, badges_by_did, style)
+    job.lap("inject")
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _timing_summary(values: List[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "samples": len(ordered),
+        "p50_ms": _percentile(ordered, 0.50) * 1000,
+        "p95_ms": _percentile(ordered, 0.95) * 1000,
+        "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+    }
+
+
+def _badge_cache_stats() -> dict:
+    infos = [
+        _render_badge_for_signature.cache_info(),
+        _render_compact_badge_for_signature.cache_info(),
+    ]
+    hits = sum(info.hits for info in infos)
+    misses = sum(info.misses for info in infos)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "size": sum(info.currsize for info in infos),
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+
+def _collection_access_stats() -> dict:
+    with _collection_access_lock:
+        kinds = {
+            kind: {"calls": calls, "ms": _collection_access.seconds.get(kind, 0.0) * 1000}
+            for kind, calls in _collection_access.calls.items()
+        }
+        slow = _collection_access.slow
+    return {"kinds": kinds, "slow": slow}
+
+
+def _render_diagnostics() -> dict:
+    jobs = list(_render_history)
+    stages = {
+        stage: _timing_summary(
+            [job.stage_seconds[stage] for job in jobs if stage in job.stage_seconds]
+        )
+        for stage in RENDER_STAGES
+    }
+    return {
+        "addon_version": ADDON_VERSION,
+        "renders": len(jobs),
+        "cache_hits": sum(1 for job in jobs if job.cache_hit),
+        "restored_renders": sum(1 for job in jobs if job.restored),
+        "incremental_updates": sum(1 for job in jobs if job.incremental),
+        "background_computations": sum(1 for job in jobs if job.background),
+        "render_cache": {
+            "hits": _render_cache.hits,
+            "misses": _render_cache.misses,
+            "coalesced": _render_cache.coalesced,
+            "trailing_refreshes": _render_cache.trailing_refreshes,
+            "saved_computations": _render_cache.saved_computations,
+        },
+        "badge_cache": _badge_cache_stats(),
+        "warm_up": {
+            "started": _profile_warm_up.started,
+            "completed": _profile_warm_up.completed,
+            "superseded": _profile_warm_up.superseded,
+            "joined": _profile_warm_up.joined,
+            "last_ms": (
+                None
+                if _profile_warm_up.last_seconds is None
+                else _profile_warm_up.last_seconds * 1000
+            ),
+            "last_decks": _profile_warm_up.last_decks,
+        },
+        "status_export": {"writes": _status_export.writes, "unchanged": _status_export.unchanged},
+        "fractional_health": {
+            "subscribed": _fractional_health.subscribed,
+            "fetches": _fractional_health.fetches,
+            "reuses": _fractional_health.reuses,
+        },
+        "total": _timing_summary([job.total_seconds for job in jobs]),
+        "last_render_ms": jobs[-1].total_seconds * 1000 if jobs else None,
+        "stages": stages,
+        "decks_per_render": [job.deck_count for job in jobs if job.deck_count],
+        "hidden_decks_per_render": [job.hidden_deck_count for job in jobs if job.hidden_deck_count],
+        "uncounted_decks_per_render": [
+            job.uncounted_deck_count for job in jobs if job.uncounted_deck_count
+        ],
+        "queries_per_render": [job.query_count for job in jobs],
+        "query_ms_per_render": [job.query_seconds * 1000 for job in jobs],
+        "collection_calls": _collection_access_stats(),
+        "badges_per_render": [job.badge_count for job in jobs],
+        "decks_per_incremental_update": [job.updated_deck_count for job in jobs if job.incremental],
+    }
+
+
+def _format_diagnostics(diagnostics: dict) -> str:
+    if not diagnostics["renders"]:
+        return "No deck-browser renders recorded yet."
+
+    lines = [
+        (
+            f"Renders: {diagnostics['renders']} "
+            f"(cache hits: {diagnostics['cache_hits']}, "
+            f"incremental: {diagnostics['incremental_updates']}, "
+            f"background: {diagnostics['background_computations']}, "
+            f"restored from disk: {diagnostics['restored_renders']})"
+        ),
+        "",
+        f"{'Stage':<10} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}",
+    ]
+    rows = [(stage, diagnostics["stages"][stage]) for stage in RENDER_STAGES]
+    rows.append(("total", diagnostics["total"]))
+    for name, summary in rows:
+        if not summary["samples"]:
+            continue
+        lines.append(
+            f"{name:<10} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} "
+            f"{summary['max_ms']:>9.2f}"
+        )
+    decks = diagnostics["decks_per_render"]
+    badges = diagnostics["badges_per_render"]
+    queries = diagnostics["queries_per_render"]
+    query_ms = diagnostics["query_ms_per_render"]
+    lines.append("")
+    lines.append(
+        f"Last render: {diagnostics['last_render_ms']:.1f} ms, "
+        f"{queries[-1]} collection calls ({query_ms[-1]:.1f} ms); max {max(queries)} calls"
+    )
+    if decks:
+        lines.append(f"Decks per computed render: last {decks[-1]}, max {max(decks)}")
+    hidden = diagnostics["hidden_decks_per_render"]
+    if hidden:
+        lines.append(f"Decks folded into collapsed rows: last {hidden[-1]}, max {max(hidden)}")
+    uncounted = diagnostics["uncounted_decks_per_render"]
+    if uncounted:
+        lines.append(
+            f"Unmonitored decks left uncounted: last {uncounted[-1]}, max {max(uncounted)}"
+        )
+    lines.append(f"Badges per render: last {badges[-1]}, max {max(badges)}")
+    updated = diagnostics["decks_per_incremental_update"]
+    if updated:
+        lines.append(
+            f"Decks re-evaluated per incremental update: last {updated[-1]}, max {max(updated)}"
+        )
+    collection_calls = diagnostics["collection_calls"]
+    busiest = sorted(
+        collection_calls["kinds"].items(), key=lambda item: item[1]["ms"], reverse=True
+    )[:COLLECTION_CALL_KINDS_SHOWN]
+    if busiest:
+        lines.append(
+            "Collection calls by time: "
+            + ", ".join(f"{kind} {stats['calls']}x/{stats['ms']:.1f} ms" for kind, stats in busiest)
+        )
+    if collection_calls["slow"]:
+        lines.append(
+            f"Slow collection calls: {collection_calls['slow']} (logged to {SLOW_QUERY_LOG_PATH})"
+        )
+    badge_cache = diagnostics["badge_cache"]
+    lines.append(
+        f"Badge cache: {badge_cache['hit_rate']:.0%} hit rate "
+        f"({badge_cache['hits']} hits, {badge_cache['misses']} misses, "
+        f"{badge_cache['size']} entries)"
+    )
+    warm_up = diagnostics["warm_up"]
+    if warm_up["last_ms"] is not None:
+        lines.append(
+            f"Profile warm-up: {warm_up['last_ms']:.1f} ms for {warm_up['last_decks']} decks "
+            f"({warm_up['completed']} of {warm_up['started']} completed, "
+            f"{warm_up['joined']} renders waited for it, {warm_up['superseded']} superseded)"
+        )
+    status_export = diagnostics["status_export"]
+    if status_export["writes"] or status_export["unchanged"]:
+        lines.append(
+            f"Status export: {status_export['writes']} writes, "
+            f"{status_export['unchanged']} unchanged snapshots skipped"
+        )
+    render_cache = diagnostics["render_cache"]
+    if render_cache["coalesced"]:
+        lines.append(
+            f"Coalesced refreshes: {render_cache['coalesced']} "
+            f"({render_cache['trailing_refreshes']} trailing, "
+            f"{render_cache['saved_computations']} computations saved)"
+        )
+    health = diagnostics["fractional_health"]
+    if health["fetches"] or health["reuses"]:
+        lines.append(
+            f"Fractional Scheduler health: {health['fetches']} fetches, "
+            f"{health['reuses']} reused ({'notified' if health['subscribed'] else 'polled'})"
+        )
+    return "\n".join(lines)
+
+
+def _export_diagnostics() -> None:
+    diagnostics = _render_diagnostics()
+    diagnostics["history"] = [job.to_dict() for job in list(_render_history)]
+    try:
+        with open(DIAGNOSTICS_PATH, "w", encoding="utf-8") as handle:
+            json.dump(diagnostics, handle, indent=2)
+    except Exception as err:
+        showInfo(f"Could not export diagnostics: {err}")
+        return
+    showInfo(f"Diagnostics exported to {DIAGNOSTICS_PATH}")
+
+
+def _update_diagnostics_view(dialog: QDialog) -> None:
+    dialog.diagnostics_view.setPlainText(_format_diagnostics(_render_diagnostics()))
 
 
 def _refresh_deck_browser() -> None:
@@ -790,6 +2343,12 @@ def _save_settings(dialog: QDialog) -> None:
     config["fractional_scheduler_health_override"] = (
         dialog.fractional_override_checkbox.isChecked()
     )
+    config["async_status_computation"] = dialog.async_checkbox.isChecked()
+    config["refresh_coalesce_ms"] = dialog.coalesce_spin.value()
+    config["slow_query_ms"] = dialog.slow_query_spin.value()
+    config["export_status_json"] = dialog.export_checkbox.isChecked()
+    config["compact_tooltips"] = dialog.compact_checkbox.isChecked()
+    config["lazy_collapsed_subtrees"] = dialog.lazy_checkbox.isChecked()
     _save_config(config)
     _refresh_deck_browser()
     dialog.close()
@@ -829,6 +2388,47 @@ def _build_settings_dialog() -> QDialog:
     )
     form.addRow("Fractional Scheduler", dialog.fractional_override_checkbox)
 
+    dialog.async_checkbox = QCheckBox(
+        "Compute badges in the background and add them once they are ready"
+    )
+    form.addRow("Performance", dialog.async_checkbox)
+
+    dialog.lazy_checkbox = QCheckBox("Skip detailed evaluation of decks under collapsed rows")
+    dialog.lazy_checkbox.setToolTip(
+        "All decks are still listed and counted, and expanding or collapsing a deck "
+        "recomputes every badge."
+    )
+    form.addRow("", dialog.lazy_checkbox)
+
+    dialog.coalesce_spin = QSpinBox()
+    dialog.coalesce_spin.setRange(0, MAX_REFRESH_COALESCE_MS)
+    dialog.coalesce_spin.setSingleStep(50)
+    dialog.coalesce_spin.setSuffix(" ms")
+    dialog.coalesce_spin.setToolTip(
+        "Refreshes this soon after a computation reuse its badges; 0 turns this off."
+    )
+    form.addRow("Coalesce refreshes within", dialog.coalesce_spin)
+
+    dialog.slow_query_spin = QSpinBox()
+    dialog.slow_query_spin.setRange(0, MAX_SLOW_QUERY_MS)
+    dialog.slow_query_spin.setSingleStep(50)
+    dialog.slow_query_spin.setSuffix(" ms")
+    dialog.slow_query_spin.setToolTip(
+        "Collection calls taking at least this long are written to slow_queries.log in the "
+        "add-on folder; 0 turns this off."
+    )
+    form.addRow("Log collection calls slower than", dialog.slow_query_spin)
+
+    dialog.export_checkbox = QCheckBox(
+        "Write deck statuses to user_files/deck_status.json for external tools"
+    )
+    form.addRow("Export", dialog.export_checkbox)
+
+    dialog.compact_checkbox = QCheckBox(
+        "Compact badges: build tooltips on hover (lighter deck list for large collections)"
+    )
+    form.addRow("Tooltips", dialog.compact_checkbox)
+
     dialog.include_edit = QPlainTextEdit()
     dialog.include_edit.setTabChangesFocus(True)
     dialog.include_edit.setFixedHeight(110)
@@ -853,6 +2453,25 @@ def _build_settings_dialog() -> QDialog:
 
     layout.addLayout(form)
 
+    diagnostics_title = QLabel("<b>Diagnostics</b>")
+    layout.addWidget(diagnostics_title)
+
+    dialog.diagnostics_view = QPlainTextEdit()
+    dialog.diagnostics_view.setReadOnly(True)
+    dialog.diagnostics_view.setFixedHeight(190)
+    dialog.diagnostics_view.setStyleSheet("font-family: monospace;")
+    layout.addWidget(dialog.diagnostics_view)
+
+    diagnostics_buttons = QHBoxLayout()
+    refresh_button = QPushButton("Refresh")
+    refresh_button.clicked.connect(lambda: _update_diagnostics_view(dialog))
+    diagnostics_buttons.addWidget(refresh_button)
+    export_button = QPushButton("Export JSON")
+    export_button.clicked.connect(_export_diagnostics)
+    diagnostics_buttons.addWidget(export_button)
+    diagnostics_buttons.addStretch()
+    layout.addLayout(diagnostics_buttons)
+
     buttons = QDialogButtonBox(
         QDialogButtonBox.StandardButton.Save | QDialogButtonBox.StandardButton.Close
     )
@@ -878,20 +2497,27 @@ def _show_settings() -> None:
     if _settings_dialog is None:
         _settings_dialog = _build_settings_dialog()
 
-    config = _load_config()
+    config = _get_config()
     _settings_dialog.setWindowTitle(f"Notify Empty Decks Settings (v{ADDON_VERSION})")
-    _settings_dialog.use_regex_checkbox.setChecked(bool(config.get("use_regex_patterns", False)))
-    index = _settings_dialog.container_mode_combo.findData(config.get("container_deck_mode"))
+    _settings_dialog.use_regex_checkbox.setChecked(config.use_regex_patterns)
+    index = _settings_dialog.container_mode_combo.findData(config.container_deck_mode)
     if index >= 0:
         _settings_dialog.container_mode_combo.setCurrentIndex(index)
     _settings_dialog.fractional_override_checkbox.setChecked(
-        bool(config.get("fractional_scheduler_health_override", False))
+        config.fractional_scheduler_health_override
     )
-    _settings_dialog.include_edit.setPlainText("\n".join(config.get("include_patterns", [])))
-    _settings_dialog.exclude_edit.setPlainText("\n".join(config.get("exclude_patterns", [])))
+    _settings_dialog.async_checkbox.setChecked(config.async_status_computation)
+    _settings_dialog.coalesce_spin.setValue(config.refresh_coalesce_ms)
+    _settings_dialog.slow_query_spin.setValue(config.slow_query_ms)
+    _settings_dialog.export_checkbox.setChecked(config.export_status_json)
+    _settings_dialog.compact_checkbox.setChecked(config.compact_tooltips)
+    _settings_dialog.lazy_checkbox.setChecked(config.lazy_collapsed_subtrees)
+    _settings_dialog.include_edit.setPlainText("\n".join(config.include_patterns))
+    _settings_dialog.exclude_edit.setPlainText("\n".join(config.exclude_patterns))
     _update_pattern_mode_help(_settings_dialog)
     _update_container_mode_help(_settings_dialog)
     _update_fractional_override_help(_settings_dialog)
+    _update_diagnostics_view(_settings_dialog)
     _settings_dialog.resize(860, 760)
     _settings_dialog.show()
     _settings_dialog.raise_()
@@ -909,8 +2535,105 @@ def _add_menu_action() -> None:
 
 
 def _on_profile_open() -> None:
+    _render_cache.clear()
+    _take_status_snapshot()
+    _pending_changes.full_rebuild = True
+    _profile_warm_up.running = None
+    with _fractional_health_lock:
+        _fractional_health.reset()
+    if mw and mw.col:
+        _restore_persisted_status()
+        _start_profile_warm_up()
     _add_menu_action()
 
 
+def _on_profile_will_close() -> None:
+    global _status_generation
+    # Cancel computations still running for this profile, including a warm-up that is
+    # waiting for a render that will not come.
+    _status_generation += 1
+    _cancel_profile_warm_up()
+    if not mw or not mw.col:
+        return
+    # A snapshot still held by a background computation is simply not persisted.
+    snapshot = _take_status_snapshot()
+    if snapshot is not None:
+        _save_persisted_status(snapshot, _get_config())
+
+
+def _undo_redo_available() -> Optional[bool]:
+    undo_status = getattr(mw.col, "undo_status", None)
+    if not callable(undo_status):
+        return None
+    try:
+        return bool(getattr(_collection_call("col.undo_status", undo_status), "redo", ""))
+    except Exception:
+        return None
+
+
+def _on_operation_did_execute(changes, handler) -> None:
+    global _redo_available
+    if not mw or not mw.col:
+        return
+    if getattr(changes, "deck", False) or getattr(changes, "deck_config", False):
+        _pending_changes.full_rebuild = True
+    if getattr(changes, "card", False):
+        _pending_changes.cards = True
+
+    # Undo and redo restore cards with their old modification times. After an undo there
+    # is something to redo, and the next operation may be that redo, so both rebuild.
+    redo_available = _undo_redo_available()
+    if redo_available is None or redo_available or _redo_available:
+        _pending_changes.full_rebuild = True
+    _redo_available = bool(redo_available)
+
+    state_key = _collection_state_key()
+    if state_key is None:
+        _pending_changes.full_rebuild = True
+    else:
+        _pending_changes.mod = state_key[0]
+
+
+def _on_webview_will_set_content(web_content, context) -> None:
+    if context is None or context is not getattr(mw, "deckBrowser", None):
+        return
+    if _get_config().compact_tooltips:
+        web_content.head += COMPACT_BADGE_HEAD
+
+
+def _on_fractional_health_changed(*_args, **_kwargs) -> None:
+    # May be called from any thread, so the notification is handled on the main thread.
+    taskman = getattr(mw, "taskman", None)
+    if taskman is not None:
+        taskman.run_on_main(_apply_fractional_health_change)
+    else:
+        with _fractional_health_lock:
+            _fractional_health.notifications += 1
+
+
+def _apply_fractional_health_change() -> None:
+    # The bumped token invalidates the cached render.
+    with _fractional_health_lock:
+        _fractional_health.notifications += 1
+    if getattr(mw, "state", None) != "deckBrowser" or _render_cache.refresh_scheduled:
+        return
+    # A burst of notifications is folded into one trailing refresh, which recomputes the
+    # badges and patches them in place.
+    delay_ms = _get_config().refresh_coalesce_ms
+    if delay_ms and _schedule_trailing_refresh(delay_ms):
+        _render_cache.refresh_scheduled = True
+    else:
+        _refresh_deck_browser()
+
+
+def _on_sync_did_finish() -> None:
+    # Synced cards keep the modification time they had on the other device.
+    _pending_changes.full_rebuild = True
+
+
 gui_hooks.deck_browser_will_render_content.append(_decorate_deck_browser)
 gui_hooks.profile_did_open.append(_on_profile_open)
+gui_hooks.profile_will_close.append(_on_profile_will_close)
+gui_hooks.operation_did_execute.append(_on_operation_did_execute)
+gui_hooks.sync_did_finish.append(_on_sync_did_finish)
+gui_hooks.webview_will_set_content.append(_on_webview_will_set_content)
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# The model sits next to this file; finding it there works from any working directory,
+# with python -m, and from inside an installed add-on folder.
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from status_model import (
+    CARD_COUNTS_SQL,
+    CONTAINER_MODE_CHOICES,
+    DeckHierarchy,
+    DeckInfo,
+    _apply_monitoring,
+    _build_effective_config,
+    _compute_self_status,
+    _deck_new_limit_override,
+    _link_deck_infos,
+    _normalize_config,
+    _preset_new_limit,
+    _should_show_badge,
+)
+
+MMAP_SIZE = 256 * 1024 * 1024
+COLLECTION_SUFFIX = ".anki2"
+DECK_NAME_SEPARATOR = "\x1f"
+# Anki falls back to the default preset for decks without one, such as filtered decks.
+DEFAULT_DECK_CONFIG_ID = 1
+
+# Field numbers from Anki's decks.proto and deck_config.proto.
+DECK_KIND_NORMAL = 1
+DECK_KIND_FILTERED = 2
+NORMAL_DECK_CONFIG_ID = 1
+NORMAL_DECK_NEW_LIMIT = 7
+DECK_CONFIG_NEW_PER_DAY = 9
+
+AUDIT_FIELDS = (
+    "collection",
+    "did",
+    "name",
+    "monitored",
+    "is_filtered",
+    "is_container",
+    "new_limit",
+    "limit_source",
+    "unsuspended_new",
+    "suspended_new",
+    "self_status",
+    "agg_status",
+    "agg_unsuspended_new",
+    "agg_suspended_new",
+    "badge",
+)
+
+
+def _open_collection(path: Path) -> sqlite3.Connection:
+    # Read-only, so a collection that Anki or a sync server has open is never written to.
+    connection = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    connection.execute(f"pragma mmap_size = {MMAP_SIZE}")
+    connection.execute("pragma query_only = 1")
+    return connection
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _protobuf_fields(data: bytes) -> Dict[int, object]:
+    # Just enough protobuf to read the handful of scalar and nested fields we need.
+    fields: Dict[int, object] = {}
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        number, wire_type = key >> 3, key & 0x07
+        value: object
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos : pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos : pos + length], pos + length
+        elif wire_type == 5:
+            value, pos = data[pos : pos + 4], pos + 4
+        else:
+            raise ValueError(f"unsupported protobuf wire type {wire_type}")
+        fields[number] = value
+    return fields
+
+
+def _has_table(connection: sqlite3.Connection, name: str) -> bool:
+    row = connection.execute(
+        "select 1 from sqlite_master where type = 'table' and name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def _load_decks(connection: sqlite3.Connection) -> Tuple[List[dict], Dict[int, Optional[int]]]:
+    preset_limits: Dict[int, Optional[int]] = {}
+    if not _has_table(connection, "decks"):
+        # Schema 11 keeps decks and presets as JSON in the col row.
+        decks_json, dconf_json = connection.execute("select decks, dconf from col").fetchone()
+        decks = list(json.loads(decks_json).values())
+        for conf_id, preset in json.loads(dconf_json).items():
+            preset_limits[int(conf_id)] = _preset_new_limit(preset)
+        return decks, preset_limits
+
+    decks = []
+    for did, name, kind in connection.execute("select id, name, kind from decks"):
+        deck: dict = {"id": did, "name": name.replace(DECK_NAME_SEPARATOR, "::"), "dyn": 0}
+        kind_fields = _protobuf_fields(kind or b"")
+        if DECK_KIND_FILTERED in kind_fields:
+            deck["dyn"] = 1
+        normal = kind_fields.get(DECK_KIND_NORMAL)
+        if isinstance(normal, bytes):
+            normal_fields = _protobuf_fields(normal)
+            deck["conf"] = normal_fields.get(NORMAL_DECK_CONFIG_ID, 0)
+            if NORMAL_DECK_NEW_LIMIT in normal_fields:
+                deck["newLimit"] = normal_fields[NORMAL_DECK_NEW_LIMIT]
+        decks.append(deck)
+
+    for conf_id, config in connection.execute("select id, config from deck_config"):
+        # proto3 leaves zero values out, so a missing new_per_day is a 0/day preset.
+        per_day = _protobuf_fields(config or b"").get(DECK_CONFIG_NEW_PER_DAY, 0)
+        preset_limits[int(conf_id)] = per_day if isinstance(per_day, int) else None
+    return decks, preset_limits
+
+
+def _count_cards(connection: sqlite3.Connection) -> Dict[int, Tuple[int, int, int]]:
+    return {
+        int(home_did): (int(total or 0), int(unsuspended_new or 0), int(suspended_new or 0))
+        for home_did, total, unsuspended_new, suspended_new in connection.execute(
+            CARD_COUNTS_SQL
+        )
+    }
+
+
+def _audit_collection(path: str, settings: dict) -> Tuple[str, List[dict], Optional[str]]:
+    try:
+        connection = _open_collection(Path(path))
+        try:
+            decks, preset_limits = _load_decks(connection)
+            card_counts = _count_cards(connection)
+        finally:
+            connection.close()
+    except Exception as err:
+        return path, [], str(err)
+
+    config = _build_effective_config(settings)
+    infos: List[DeckInfo] = []
+    for deck in sorted(decks, key=lambda deck: deck["name"]):
+        if infos and infos[-1].name == deck["name"]:
+            # Only the first deck of a duplicated name gets a hierarchy slot.
+            continue
+        did = int(deck["id"])
+        new_limit = _deck_new_limit_override(deck)
+        limit_source = "deck"
+        if new_limit is None:
+            new_limit = preset_limits.get(deck.get("conf", DEFAULT_DECK_CONFIG_ID))
+            limit_source = "unknown" if new_limit is None else "config"
+        total_cards, unsuspended_new, suspended_new = card_counts.get(did, (0, 0, 0))
+        # There is no scheduler here, so today's new count is estimated from the limit;
+        # only whether it is zero matters for the status.
+        effective_new_count = unsuspended_new
+        if new_limit is not None:
+            effective_new_count = min(max(new_limit, 0), unsuspended_new)
+        infos.append(
+            DeckInfo(
+                did=did,
+                name=deck["name"],
+                is_filtered=bool(deck.get("dyn", False)),
+                total_cards=total_cards,
+                new_limit=new_limit,
+                limit_source=limit_source,
+                unsuspended_new=unsuspended_new,
+                suspended_new=suspended_new,
+                effective_new_count=effective_new_count,
+                self_status=_compute_self_status(new_limit, unsuspended_new, effective_new_count),
+            )
+        )
+
+    hierarchy = DeckHierarchy(tuple(info.name for info in infos))
+    _link_deck_infos(infos, hierarchy)
+    _apply_monitoring(infos, hierarchy, config)
+    rows = [
+        {
+            "collection": path,
+            "did": info.did,
+            "name": info.name,
+            "monitored": info.monitored,
+            "is_filtered": info.is_filtered,
+            "is_container": info.is_container,
+            "new_limit": info.new_limit,
+            "limit_source": info.limit_source,
+            "unsuspended_new": info.unsuspended_new,
+            "suspended_new": info.suspended_new,
+            "self_status": info.self_status,
+            "agg_status": info.agg_status,
+            "agg_unsuspended_new": info.agg_unsuspended_new,
+            "agg_suspended_new": info.agg_suspended_new,
+            "badge": _should_show_badge(info, config),
+        }
+        for info in infos
+    ]
+    return path, rows, None
+
+
+def _find_collections(paths: List[Path]) -> List[str]:
+    found: List[str] = []
+    for path in paths:
+        if path.is_dir():
+            found.extend(str(match) for match in sorted(path.rglob(f"*{COLLECTION_SUFFIX}")))
+        else:
+            found.append(str(path))
+    return found
+
+
+def _audit_all(
+    collections: List[str], settings: dict, jobs: int
+) -> Iterator[Tuple[str, List[dict], Optional[str]]]:
+    if jobs <= 1 or len(collections) <= 1:
+        for path in collections:
+            yield _audit_collection(path, settings)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # map keeps the input order, so output is stable while results still stream.
+        yield from executor.map(
+            _audit_collection, collections, [settings] * len(collections), chunksize=1
+        )
+
+
+def _load_settings(args: argparse.Namespace) -> dict:
+    loaded = None
+    if args.config is not None:
+        loaded = json.loads(args.config.read_text(encoding="utf-8"))
+    settings = _normalize_config(loaded)
+    if args.container_mode is not None:
+        settings["container_deck_mode"] = args.container_mode
+    # There is no Fractional Scheduler API outside Anki.
+    settings["fractional_scheduler_health_override"] = False
+    return settings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Audit deck exhaustion in Anki collection files without running Anki."
+    )
+    parser.add_argument("paths", nargs="+", type=Path, help="collection files or directories")
+    parser.add_argument("--config", type=Path, help="add-on style config.json to apply")
+    parser.add_argument(
+        "--container-mode", choices=[choice[0] for choice in CONTAINER_MODE_CHOICES]
+    )
+    parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    parser.add_argument("--output", type=Path, help="write here instead of stdout")
+    parser.add_argument(
+        "--problems-only", action="store_true", help="only emit decks that would show a badge"
+    )
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    settings = _load_settings(args)
+    collections = _find_collections(args.paths)
+    output = args.output.open("w", encoding="utf-8", newline="") if args.output else sys.stdout
+    failures = 0
+    try:
+        writer = None
+        if args.format == "csv":
+            writer = csv.DictWriter(output, fieldnames=AUDIT_FIELDS)
+            writer.writeheader()
+        for path, rows, error in _audit_all(collections, settings, args.jobs):
+            if error is not None:
+                failures += 1
+                print(f"{path}: {error}", file=sys.stderr)
+                if writer is None:
+                    output.write(json.dumps({"collection": path, "error": error}) + "\n")
+                continue
+            for row in rows:
+                if args.problems_only and not row["badge"]:
+                    continue
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    output.write(json.dumps(row) + "\n")
+            output.flush()
+    finally:
+        if args.output:
+            output.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import importlib.util
+import sys
+import types
+from pathlib import Path
+from typing import Any, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+ADDON_MODULE_NAME = "notify_empty_decks"
+
+QT_NAMES = (
+    "QAction",
+    "QCheckBox",
+    "QComboBox",
+    "QDialog",
+    "QDialogButtonBox",
+    "QFormLayout",
+    "QHBoxLayout",
+    "QLabel",
+    "QPlainTextEdit",
+    "QPushButton",
+    "QSpinBox",
+    "QTimer",
+    "QVBoxLayout",
+)
+
+
+class _Hook(list):
+    pass
+
+
+class _Widget:
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return lambda *args, **kwargs: None
+
+
+class _HookNamespace:
+    def __getattr__(self, name: str) -> _Hook:
+        hook = _Hook()
+        setattr(self, name, hook)
+        return hook
+
+
+def install_aqt_stubs(mw: Optional[object] = None) -> types.ModuleType:
+    aqt = types.ModuleType("aqt")
+    aqt.gui_hooks = _HookNamespace()  # type: ignore[attr-defined]
+    aqt.mw = mw  # type: ignore[attr-defined]
+
+    qt = types.ModuleType("aqt.qt")
+    for name in QT_NAMES:
+        setattr(qt, name, type(name, (_Widget,), {}))
+
+    utils = types.ModuleType("aqt.utils")
+    utils.showInfo = lambda *args, **kwargs: None  # type: ignore[attr-defined]
+    utils.tooltip = lambda *args, **kwargs: None  # type: ignore[attr-defined]
+
+    sys.modules["aqt"] = aqt
+    sys.modules["aqt.qt"] = qt
+    sys.modules["aqt.utils"] = utils
+    return aqt
+
+
+def load_addon(mw: Optional[object] = None) -> types.ModuleType:
+    for name in list(sys.modules):
+        if name == ADDON_MODULE_NAME or name.startswith(f"{ADDON_MODULE_NAME}."):
+            del sys.modules[name]
+
+    install_aqt_stubs(mw)
+    spec = importlib.util.spec_from_file_location(
+        ADDON_MODULE_NAME,
+        ROOT / "__init__.py",
+        submodule_search_locations=[str(ROOT)],
+    )
+    if spec is None or spec.loader is None:
+        raise ImportError(f"cannot load add-on from {ROOT}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[ADDON_MODULE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
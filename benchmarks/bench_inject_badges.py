@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from addon_loader import load_addon
+from fake_collection import render_deck_rows
+
+
+def build_tree_html(rows: int) -> str:
+    return render_deck_rows((1_000_000 + index, f"Deck {index}") for index in range(rows))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark deck-tree badge injection.")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--badge-every", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    addon = load_addon()
+    tree_html = build_tree_html(args.rows)
+    badge = '<span class="notify-empty-decks-badge">!</span>'
+    badges_by_did = {
+        1_000_000 + index: badge for index in range(0, args.rows, max(1, args.badge_every))
+    }
+
+    current = min(
+        timeit.repeat(
+            lambda: addon._inject_badges(tree_html, badges_by_did),
+            number=1,
+            repeat=args.repeat,
+        )
+    )
+    empty = min(
+        timeit.repeat(lambda: addon._inject_badges(tree_html, {}), number=1, repeat=args.repeat)
+    )
+
+    print(f"rows={args.rows} badges={len(badges_by_did)} html={len(tree_html) / 1024:.0f} KiB")
+    print(f"with badges:   {current * 1000:8.2f} ms")
+    print(f"no badges:     {empty * 1000:8.4f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
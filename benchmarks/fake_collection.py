@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import random
+import sqlite3
+from html import escape
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+CARD_SCHEMA = """
+create table cards (
+  id integer primary key,
+  nid integer not null,
+  did integer not null,
+  odid integer not null default 0,
+  type integer not null,
+  queue integer not null,
+  due integer not null default 0,
+  mod integer not null default 0
+);
+create index ix_cards_sched on cards (did, queue, due);
+create index ix_cards_odid on cards (odid) where odid != 0;
+"""
+
+DECK_NAME_PARTS = (
+    "Languages",
+    "Music",
+    "Math",
+    "Archive",
+    "Biology",
+    "History",
+    "Kanji",
+    "Vocab",
+    "Grammar",
+    "Reading",
+)
+
+PRESET_NEW_LIMITS = {1: 20, 2: 0, 3: 5, 4: 50}
+
+
+class FakeDB:
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+        self.query_count = 0
+
+    def _run(self, sql: str, args: Tuple[Any, ...]) -> sqlite3.Cursor:
+        self.query_count += 1
+        return self.connection.execute(sql, args)
+
+    def scalar(self, sql: str, *args: Any) -> Any:
+        row = self._run(sql, args).fetchone()
+        return row[0] if row else None
+
+    def all(self, sql: str, *args: Any) -> List[List[Any]]:
+        return [list(row) for row in self._run(sql, args)]
+
+    def list(self, sql: str, *args: Any) -> List[Any]:
+        return [row[0] for row in self._run(sql, args)]
+
+    def first(self, sql: str, *args: Any) -> Optional[List[Any]]:
+        row = self._run(sql, args).fetchone()
+        return list(row) if row else None
+
+    def execute(self, sql: str, *args: Any) -> List[List[Any]]:
+        return self.all(sql, *args)
+
+
+class FakeNameId:
+    def __init__(self, did: int, name: str) -> None:
+        self.id = did
+        self.name = name
+
+
+class FakeDeckTreeNode:
+    def __init__(self, deck_id: int, name: str, level: int, collapsed: bool) -> None:
+        self.deck_id = deck_id
+        self.name = name
+        self.level = level
+        self.collapsed = collapsed
+        self.new_count = 0
+        self.children: List[FakeDeckTreeNode] = []
+
+
+class FakeUndoStatus:
+    def __init__(self) -> None:
+        self.undo = ""
+        self.redo = ""
+        self.last_step = 0
+
+
+class FakeDecks:
+    def __init__(self, collection: FakeCollection) -> None:
+        self.collection = collection
+
+    def all_names_and_ids(self) -> List[FakeNameId]:
+        return [FakeNameId(deck["id"], deck["name"]) for deck in self.collection.deck_dicts.values()]
+
+    def all(self) -> List[Dict[str, Any]]:
+        return [dict(deck) for deck in self.collection.deck_dicts.values()]
+
+    def all_ids(self) -> List[int]:
+        return list(self.collection.deck_dicts)
+
+    def get(self, did: int, default: bool = True) -> Optional[Dict[str, Any]]:
+        deck = self.collection.deck_dicts.get(int(did))
+        return dict(deck) if deck else None
+
+    def name(self, did: int) -> str:
+        return self.collection.deck_dicts[int(did)]["name"]
+
+    def all_config(self) -> List[Dict[str, Any]]:
+        return [dict(preset) for preset in self.collection.presets.values()]
+
+    def get_config(self, conf_id: int) -> Dict[str, Any]:
+        return dict(self.collection.presets[int(conf_id)])
+
+    def config_dict_for_deck_id(self, did: int) -> Dict[str, Any]:
+        deck = self.collection.deck_dicts[int(did)]
+        return dict(self.collection.presets[int(deck.get("conf", 1))])
+
+
+class FakeScheduler:
+    def __init__(self, collection: FakeCollection) -> None:
+        self.collection = collection
+        self.today = 1000
+        self.due_tree_calls = 0
+
+    def deck_due_tree(self) -> FakeDeckTreeNode:
+        self.due_tree_calls += 1
+        collection = self.collection
+        available = dict(
+            collection.db.all(
+                "select (case when odid then odid else did end), sum(type=0 and queue=0) "
+                "from cards group by 1"
+            )
+        )
+        root = FakeDeckTreeNode(0, "", 0, False)
+        nodes: Dict[str, FakeDeckTreeNode] = {}
+        for deck in sorted(collection.deck_dicts.values(), key=lambda item: item["name"]):
+            name = deck["name"]
+            node = FakeDeckTreeNode(
+                deck["id"], name.rsplit("::", 1)[-1], name.count("::") + 1, deck["collapsed"]
+            )
+            if not deck["dyn"]:
+                limit = PRESET_NEW_LIMITS[deck["conf"]]
+                if deck.get("newLimit") is not None:
+                    limit = deck["newLimit"]
+                node.new_count = min(limit, int(available.get(deck["id"]) or 0))
+            nodes[name] = node
+            parent = name.rsplit("::", 1)[0] if "::" in name else ""
+            nodes.get(parent, root).children.append(node)
+        return root
+
+
+class FakeCollection:
+    def __init__(self) -> None:
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.executescript(CARD_SCHEMA)
+        self.db = FakeDB(self.connection)
+        self.decks = FakeDecks(self)
+        self.sched = FakeScheduler(self)
+        self.mod = 1_700_000_000_000
+        self.deck_dicts: Dict[int, Dict[str, Any]] = {}
+        self.presets: Dict[int, Dict[str, Any]] = {
+            conf_id: {"id": conf_id, "name": f"Preset {conf_id}", "new": {"perDay": per_day}}
+            for conf_id, per_day in PRESET_NEW_LIMITS.items()
+        }
+
+    def undo_status(self) -> FakeUndoStatus:
+        return FakeUndoStatus()
+
+    @property
+    def card_count(self) -> int:
+        return int(self.connection.execute("select count() from cards").fetchone()[0])
+
+
+class FakeMainWindow:
+    def __init__(self, collection: FakeCollection) -> None:
+        self.col = collection
+        self.state = "deckBrowser"
+        self.deckBrowser = None
+        self.taskman = None
+
+
+def _deck_names(
+    deck_count: int, root_count: int, branching: int, max_depth: int, rng: random.Random
+) -> List[str]:
+    names: List[str] = []
+    frontier: List[Tuple[str, int]] = [("", 0)]
+    while frontier and len(names) < deck_count:
+        next_frontier: List[Tuple[str, int]] = []
+        for parent, depth in frontier:
+            child_count = rng.randint(1, branching) if parent else root_count
+            for index in range(child_count):
+                part = DECK_NAME_PARTS[rng.randrange(len(DECK_NAME_PARTS))]
+                name = f"{parent}::{part} {index}" if parent else f"{part} {index}"
+                names.append(name)
+                if depth + 1 < max_depth:
+                    next_frontier.append((name, depth + 1))
+                if len(names) >= deck_count:
+                    return names
+        frontier = next_frontier
+    return names
+
+
+def build_collection(
+    deck_count: int,
+    shape: str = "wide",
+    cards_per_deck: int = 40,
+    seed: int = 1,
+) -> FakeCollection:
+    rng = random.Random(seed)
+    if shape == "deep":
+        names = _deck_names(deck_count, root_count=10, branching=3, max_depth=24, rng=rng)
+    else:
+        names = _deck_names(deck_count, root_count=40, branching=40, max_depth=4, rng=rng)
+
+    collection = FakeCollection()
+    for index, name in enumerate(names):
+        did = 1_000_000 + index
+        is_filtered = rng.random() < 0.03
+        deck: Dict[str, Any] = {
+            "id": did,
+            "name": name,
+            "dyn": 1 if is_filtered else 0,
+            "collapsed": rng.random() < 0.25,
+        }
+        if not is_filtered:
+            deck["conf"] = rng.choice((1, 1, 1, 2, 3, 4))
+            deck["newLimit"] = 0 if rng.random() < 0.03 else None
+        collection.deck_dicts[did] = deck
+
+    home_dids = [did for did, deck in collection.deck_dicts.items() if not deck["dyn"]]
+    filtered_dids = [did for did, deck in collection.deck_dicts.items() if deck["dyn"]]
+    card_id = 1
+
+    def card_rows() -> Iterable[Tuple[int, int, int, int, int, int]]:
+        nonlocal card_id
+        for did in home_dids:
+            kind = rng.random()
+            if kind < 0.2:
+                continue
+            suspend_new = kind < 0.3
+            for _ in range(rng.randint(1, 2 * cards_per_deck)):
+                card_type = rng.choice((0, 0, 1, 2))
+                queue = card_type
+                if card_type == 0 and (suspend_new or rng.random() < 0.2):
+                    queue = -1
+                deck_id, original_deck_id = did, 0
+                if filtered_dids and rng.random() < 0.02:
+                    deck_id, original_deck_id = rng.choice(filtered_dids), did
+                yield card_id, card_id, deck_id, original_deck_id, card_type, queue
+                card_id += 1
+
+    collection.connection.executemany(
+        "insert into cards (id, nid, did, odid, type, queue) values (?, ?, ?, ?, ?, ?)",
+        card_rows(),
+    )
+    return collection
+
+
+def render_deck_rows(rows: Iterable[Tuple[int, str]]) -> str:
+    parts = ["<table cellspacing=0 cellpadding=3>"]
+    for index, (did, name) in enumerate(rows):
+        extra_class = "current" if index == 0 else ""
+        parts.append(
+            f"<tr class='deck' id='{did}'><td class=decktd colspan=5>"
+            "<span class=collapse></span>"
+            f'<a class="deck {extra_class}"\n        href=# onclick="return pycmd(\'open:{did}\')">'
+            f"{escape(name)} </a></td>"
+            "<td align=right><span class=new-count>3</span></td>"
+            f"<td align=center class=opts><a onclick='return pycmd(\"opts:{did}\");'>"
+            "<img src='/_anki/imgs/gears.svg' class=gears></a></td></tr>"
+        )
+    parts.append("</table>")
+    return "\n".join(parts)
+
+
+def deck_browser_html(collection: FakeCollection, visible_only: bool = False) -> str:
+    decks = sorted(collection.deck_dicts.values(), key=lambda deck: deck["name"])
+    if visible_only:
+        # Like Anki, leave out the rows under a collapsed deck.
+        hidden_names = set()
+        collapsed_names = {deck["name"] for deck in decks if deck["collapsed"]}
+        for deck in decks:
+            parent = deck["name"].rsplit("::", 1)[0] if "::" in deck["name"] else None
+            if parent in hidden_names or parent in collapsed_names:
+                hidden_names.add(deck["name"])
+        decks = [deck for deck in decks if deck["name"] not in hidden_names]
+    return render_deck_rows((deck["id"], deck["name"].rsplit("::", 1)[-1]) for deck in decks)
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from addon_loader import load_addon
+from fake_collection import FakeMainWindow, build_collection, deck_browser_html
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+# Timings are only comparable on the machine that recorded them, so the baseline is
+# local and git-ignored.
+DEFAULT_BASELINE_PATH = BENCHMARK_DIR / "baseline.json"
+
+SIZES = {"1k": 1_000, "10k": 10_000, "50k": 50_000}
+SHAPES = ("wide", "deep")
+STAGES = ("build_deck_info", "apply_monitoring", "render_badges", "inject_badges", "parse_page")
+TOOLTIP_MODES = ("full", "compact")
+INCREMENTAL_STAGE = "incremental_update"
+INCREMENTAL_SUSPENDED_CARDS = 5
+
+# A handful of patterns that match plus a long tail that never does, so the matchers
+# are exercised the way large hand-maintained pattern lists are.
+NOISE_PATTERN_COUNT = 200
+PATTERN_MODES: Dict[str, Dict[str, Any]] = {
+    "wildcard": {
+        "use_regex_patterns": False,
+        "include_patterns": ["Languages*", "Music*", "Kanji*", "Vocab*", "Grammar*"]
+        + [f"Unused {index}::*" for index in range(NOISE_PATTERN_COUNT)],
+        "exclude_patterns": ["*Archive*", "*::Reading ?"],
+    },
+    "regex": {
+        "use_regex_patterns": True,
+        "include_patterns": ["^(Languages|Music|Kanji|Vocab|Grammar)"]
+        + [f"^Unused {index}($|::)" for index in range(NOISE_PATTERN_COUNT)],
+        "exclude_patterns": ["Archive", r"::Reading \d$"],
+    },
+}
+
+
+def _run_pipeline(addon, config, due_tree, tree_html: str, timed: Callable) -> Tuple[int, int]:
+    hidden: Dict[int, Any] = {}
+    infos, hierarchy = timed(
+        "build_deck_info", lambda: addon._build_deck_info(config, due_tree, hidden=hidden)
+    )
+    timed(
+        "apply_monitoring",
+        lambda: addon._apply_monitoring(infos, hierarchy, config, hidden=hidden.values()),
+    )
+    badges_by_did = timed(
+        "render_badges",
+        lambda: {
+            info.did: addon._render_badge_html(info, config)
+            for info in infos
+            if addon._should_show_badge(info, config)
+        },
+    )
+    # Compact badges put their stylesheet and tooltip script in the page head instead.
+    style = addon.COMPACT_BADGE_HEAD if config.compact_tooltips else addon.BADGE_STYLE
+    page = timed("inject_badges", lambda: addon._inject_badges(tree_html, badges_by_did, style))
+    # Tokenizing the page stands in for the webview's HTML parse, which scales the same way.
+    timed("parse_page", lambda: HTMLParser().feed(page))
+    return len(badges_by_did), len(page)
+
+
+def _measure_incremental_update(addon, collection, config, repeat: int) -> float:
+    # Suspend a few new cards the way an operation would and time the render that follows.
+    best = float("inf")
+    card_ids = collection.db.list(
+        "select id from cards where type=0 and queue=0 limit ?", INCREMENTAL_SUSPENDED_CARDS
+    )
+    id_list = ",".join(str(card_id) for card_id in card_ids)
+    changes = types.SimpleNamespace(card=True, deck=False, deck_config=False)
+    addon._compute_badges(config, collection.sched.deck_due_tree())
+    for _ in range(repeat):
+        for queue in (-1, 0):
+            collection.connection.execute(
+                f"update cards set queue=?, mod=? where id in ({id_list})",
+                (queue, int(time.time())),
+            )
+            collection.mod += 1
+            addon._on_operation_did_execute(changes, None)
+            due_tree = collection.sched.deck_due_tree()
+            job = addon.RenderJob()
+            started = time.perf_counter()
+            addon._compute_badges(config, due_tree, job)
+            elapsed = time.perf_counter() - started
+            if not job.incremental:
+                raise RuntimeError("the incremental update fell back to a full rebuild")
+            best = min(best, elapsed)
+    return best
+
+
+def measure_case(
+    addon, collection, config, due_tree, tree_html: str, repeat: int, memory: bool
+) -> Dict:
+    timings: Dict[str, float] = {stage: float("inf") for stage in STAGES}
+
+    def timed(stage: str, fn: Callable) -> Any:
+        started = time.perf_counter()
+        result = fn()
+        timings[stage] = min(timings[stage], time.perf_counter() - started)
+        return result
+
+    badge_count = page_bytes = 0
+    for _ in range(repeat):
+        badge_count, page_bytes = _run_pipeline(addon, config, due_tree, tree_html, timed)
+    timings[INCREMENTAL_STAGE] = _measure_incremental_update(addon, collection, config, repeat)
+
+    peaks: Dict[str, int] = {}
+    if memory:
+        tracemalloc.start()
+
+        def traced(stage: str, fn: Callable) -> Any:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            result = fn()
+            peaks[stage] = max(0, tracemalloc.get_traced_memory()[1] - before)
+            return result
+
+        try:
+            _run_pipeline(addon, config, due_tree, tree_html, traced)
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "seconds": timings,
+        "peak_bytes": peaks,
+        "badges": badge_count,
+        "page_bytes": page_bytes,
+    }
+
+
+def _use_config(addon, config_path: Path, settings: Dict[str, Any]):
+    config_path.write_text(json.dumps(settings), encoding="utf-8")
+    addon.CONFIG_PATH = str(config_path)
+    addon._invalidate_config_cache()
+    return addon._get_config()
+
+
+def run(args: argparse.Namespace) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_path = Path(tmpdir) / "config.json"
+        for size_label in args.sizes:
+            for shape in args.shapes:
+                collection = build_collection(
+                    SIZES[size_label], shape=shape, cards_per_deck=args.cards_per_deck
+                )
+                addon = load_addon(FakeMainWindow(collection))
+                due_tree = collection.sched.deck_due_tree()
+                tree_html = deck_browser_html(collection, visible_only=args.lazy_collapsed)
+                print(
+                    f"# {size_label} {shape}: {len(collection.deck_dicts)} decks, "
+                    f"{collection.card_count} cards, {len(tree_html) // 1024} KiB of deck HTML",
+                    flush=True,
+                )
+                for container_mode, _label in addon.CONTAINER_MODE_CHOICES:
+                    for pattern_mode in args.pattern_modes:
+                        for tooltip_mode in args.tooltip_modes:
+                            settings = dict(PATTERN_MODES[pattern_mode])
+                            settings["container_deck_mode"] = container_mode
+                            settings["compact_tooltips"] = tooltip_mode == "compact"
+                            settings["lazy_collapsed_subtrees"] = args.lazy_collapsed
+                            config = _use_config(addon, config_path, settings)
+                            case_id = f"{size_label}/{shape}/{container_mode}/{pattern_mode}"
+                            if tooltip_mode != "full":
+                                case_id += f"/{tooltip_mode}"
+                            if args.lazy_collapsed:
+                                case_id += "/lazy"
+                            result = measure_case(
+                                addon,
+                                collection,
+                                config,
+                                due_tree,
+                                tree_html,
+                                args.repeat,
+                                args.memory,
+                            )
+                            results[case_id] = result
+                            _print_case(case_id, result)
+    return results
+
+
+def _print_case(case_id: str, result: Dict) -> None:
+    cells = []
+    for stage in STAGES + (INCREMENTAL_STAGE,):
+        cell = f"{stage}={result['seconds'][stage] * 1000:.1f}ms"
+        if stage in result["peak_bytes"]:
+            cell += f"/{result['peak_bytes'][stage] / 1024:.0f}KiB"
+        cells.append(cell)
+    print(
+        f"{case_id:<66} badges={result['badges']:<6} "
+        f"page={result['page_bytes'] / 1024:.0f}KiB " + " ".join(cells),
+        flush=True,
+    )
+
+
+def find_regressions(
+    results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float, min_delta: float
+) -> List[Tuple[str, str, float, float]]:
+    regressions = []
+    for case_id, result in results.items():
+        expected = baseline.get(case_id, {}).get("seconds", {})
+        for stage, seconds in result["seconds"].items():
+            reference = expected.get(stage)
+            if reference is None:
+                continue
+            if seconds > reference * tolerance and seconds - reference > min_delta:
+                regressions.append((case_id, stage, reference, seconds))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Offline per-stage benchmarks for Notify Empty Decks against a fake collection."
+    )
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=list(SIZES))
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument(
+        "--pattern-modes", nargs="+", choices=sorted(PATTERN_MODES), default=list(PATTERN_MODES)
+    )
+    parser.add_argument(
+        "--tooltip-modes", nargs="+", choices=TOOLTIP_MODES, default=list(TOOLTIP_MODES)
+    )
+    parser.add_argument(
+        "--lazy-collapsed",
+        action="store_true",
+        help="evaluate collapsed subtrees lazily and render only the visible rows",
+    )
+    parser.add_argument("--cards-per-deck", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", dest="memory", action="store_false")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=DEFAULT_BASELINE_PATH,
+        help="local timings to compare against (not tracked; see --update-baseline)",
+    )
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    parser.add_argument("--json", type=Path, help="also write the raw results to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    if args.update_baseline:
+        baseline = {}
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        for case_id, result in results.items():
+            baseline[case_id] = {"seconds": result["seconds"]}
+        args.baseline.write_text(
+            json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+        )
+        print(f"updated {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = find_regressions(results, baseline, args.tolerance, args.min_delta_ms / 1000)
+    for case_id, stage, reference, seconds in regressions:
+        print(
+            f"REGRESSION {case_id} {stage}: {seconds * 1000:.1f}ms "
+            f"(baseline {reference * 1000:.1f}ms)",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
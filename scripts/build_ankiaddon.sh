@@ -19,8 +19,12 @@ trap 'rm -rf "$tmpdir"' EXIT
 
 # Minimal addon payload. Include docs for convenience, but do not bundle
 # the developer's local config.json (it may contain personal settings).
+# audit.py is never imported by Anki; it ships so the headless audit can be run
+# straight from the installed add-on folder.
 files=(
   "__init__.py"
+  "status_model.py"
+  "audit.py"
   "manifest.json"
   "README.md"
   "DESIGN.md"
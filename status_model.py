@@ -0,0 +1,690 @@
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import json
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+STATUS_LIMITS = "limits"
+STATUS_AVAIL = "availability"
+STATUS_NORMAL = "normal"
+
+CONTAINER_MODE_ANY = "any_blocked_descendant"
+CONTAINER_MODE_ALL = "all_included_descendants_blocked"
+CONTAINER_MODE_HIDE = "hide_container_rows"
+CONTAINER_MODE_DIRECT = "direct_decks_only"
+
+RENDER_STAGES = (
+    "config",
+    "due_tree",
+    "counts",
+    "decks",
+    "matching",
+    "rollup",
+    "badges",
+    "export",
+    "inject",
+)
+RENDER_HISTORY_SIZE = 200
+
+CONTAINER_MODE_CHOICES = [
+    (CONTAINER_MODE_ANY, "Any blocked descendant"),
+    (CONTAINER_MODE_ALL, "All included descendants blocked"),
+    (CONTAINER_MODE_HIDE, "Hide container icons"),
+    (CONTAINER_MODE_DIRECT, "Direct decks only"),
+]
+
+# Backreferences, conditionals and leading inline flags change meaning once a pattern is
+# folded into a shared alternation, so those patterns are matched on their own.
+UNCOMBINABLE_PATTERN_RE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(|^\(\?[aiLmsux]+\)")
+MATCH_MEMO_LIMIT = 50000
+MAX_REFRESH_COALESCE_MS = 5000
+MAX_SLOW_QUERY_MS = 60000
+
+# Cards borrowed by a filtered deck still count toward their home deck (odid).
+CARD_COUNTS_SQL = (
+    "select (case when odid then odid else did end) as home_did, count(), "
+    "sum(type=0 and queue=0), sum(type=0 and queue=-1) "
+    "from cards group by home_did"
+)
+
+DEFAULT_CONFIG = {
+    "use_regex_patterns": False,
+    "include_patterns": [],
+    "exclude_patterns": [],
+    "container_deck_mode": CONTAINER_MODE_ANY,
+    "fractional_scheduler_health_override": False,
+    "async_status_computation": False,
+    "refresh_coalesce_ms": 250,
+    "export_status_json": False,
+    "compact_tooltips": False,
+    "lazy_collapsed_subtrees": False,
+    "slow_query_ms": 200,
+}
+
+# Settings that change the computed statuses or the badge markup. Tuning knobs such as the
+# refresh window or the slow-query threshold are left out so changing them keeps the caches.
+STATUS_CONFIG_KEYS = (
+    "use_regex_patterns",
+    "include_patterns",
+    "exclude_patterns",
+    "container_deck_mode",
+    "fractional_scheduler_health_override",
+    "compact_tooltips",
+    "lazy_collapsed_subtrees",
+)
+
+_render_history: Deque[RenderJob] = deque(maxlen=RENDER_HISTORY_SIZE)
+
+
+@dataclass(slots=True)
+class DeckInfo:
+    did: int
+    name: str
+    is_filtered: bool
+    total_cards: int
+    new_limit: Optional[int]
+    limit_source: str
+    unsuspended_new: int
+    suspended_new: int
+    effective_new_count: int
+    self_status: str
+    # False for decks whose cards were never counted; their zero counts are placeholders.
+    counts_known: bool = True
+    is_container: bool = False
+    has_children: bool = False
+    monitored: bool = False
+    direct_status: Optional[str] = None
+    descendant_status: Optional[str] = None
+    has_monitored_descendants: bool = False
+    agg_status: Optional[str] = None
+    agg_unsuspended_new: int = 0
+    agg_suspended_new: int = 0
+    agg_has_monitored: bool = False
+
+
+@dataclass(slots=True)
+class HiddenDeck:
+    # A deck under a collapsed parent row; only its share of that row's rollup is kept.
+    owner: int
+    new_limit: Optional[int]
+    monitored: bool
+    total_cards: int
+    unsuspended_new: int
+    suspended_new: int
+    self_status: str
+    has_children: bool = False
+    contribution: Tuple[int, int, int, int, int, int] = (0, 0, 0, 0, 0, 0)
+
+
+class PatternMatcher:
+    def __init__(self, patterns: Tuple[str, ...], use_regex: bool) -> None:
+        self.use_regex = use_regex
+        self.combined: Optional[Pattern[str]] = None
+        self.standalone: List[Pattern[str]] = []
+        self._results: Dict[str, bool] = {}
+
+        flags = re.IGNORECASE if use_regex else 0
+        sources: List[str] = []
+        for pattern in patterns:
+            source = pattern if use_regex else fnmatch.translate(pattern.lower())
+            try:
+                compiled = re.compile(source, flags)
+            except re.error:
+                continue
+            if UNCOMBINABLE_PATTERN_RE.search(source):
+                self.standalone.append(compiled)
+            else:
+                sources.append(source)
+
+        if len(sources) == 1:
+            self.combined = re.compile(sources[0], flags)
+        elif sources:
+            try:
+                self.combined = re.compile("|".join(f"(?:{source})" for source in sources), flags)
+            except re.error:
+                self.standalone.extend(re.compile(source, flags) for source in sources)
+
+    def matches(self, name: str) -> bool:
+        result = self._results.get(name)
+        if result is None:
+            if len(self._results) >= MATCH_MEMO_LIMIT:
+                self._results.clear()
+            result = self._matches_uncached(name)
+            self._results[name] = result
+        return result
+
+    def _matches_uncached(self, name: str) -> bool:
+        if self.use_regex:
+            if self.combined is not None and self.combined.search(name):
+                return True
+            return any(pattern.search(name) for pattern in self.standalone)
+
+        lowered_name = name.lower()
+        if self.combined is not None and self.combined.match(lowered_name):
+            return True
+        return any(pattern.match(lowered_name) for pattern in self.standalone)
+
+
+@dataclass(frozen=True)
+class EffectiveConfig:
+    use_regex_patterns: bool
+    include_patterns: Tuple[str, ...]
+    exclude_patterns: Tuple[str, ...]
+    container_deck_mode: str
+    fractional_scheduler_health_override: bool
+    async_status_computation: bool
+    refresh_coalesce_ms: int
+    export_status_json: bool
+    compact_tooltips: bool
+    lazy_collapsed_subtrees: bool
+    slow_query_ms: int
+    include_matcher: PatternMatcher
+    exclude_matcher: PatternMatcher
+    fingerprint: str
+
+
+class DeckHierarchy:
+    def __init__(self, names: Tuple[str, ...]) -> None:
+        self.key = names
+        # A parent's name is a prefix of its children's names, so it always sorts first.
+        self.names: List[str] = sorted(set(names))
+        self.slot_by_name: Dict[str, int] = {name: slot for slot, name in enumerate(self.names)}
+        self.parent: List[int] = [-1] * len(self.names)
+        self.has_children: List[bool] = [False] * len(self.names)
+        self.post_order = range(len(self.names) - 1, -1, -1)
+
+        for slot, name in enumerate(self.names):
+            parent_name = _parent_name(name)
+            if parent_name is not None:
+                self.parent[slot] = self.slot_by_name.get(parent_name, -1)
+            while parent_name is not None:
+                ancestor_slot = self.slot_by_name.get(parent_name)
+                if ancestor_slot is not None:
+                    self.has_children[ancestor_slot] = True
+                parent_name = _parent_name(parent_name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class StatusComputationCancelled(Exception):
+    pass
+
+
+class RenderJob:
+    def __init__(
+        self, should_cancel: Optional[Callable[[], bool]] = None, background: bool = False
+    ) -> None:
+        self.should_cancel = should_cancel
+        self.background = background
+        self.cache_hit = False
+        self.restored = False
+        self.coalesced = False
+        self.started_at = time.time()
+        self.stage_seconds: Dict[str, float] = {}
+        self.total_seconds = 0.0
+        self.deck_count = 0
+        self.hidden_deck_count = 0
+        self.uncounted_deck_count = 0
+        self.badge_count = 0
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.incremental = False
+        self.updated_deck_count = 0
+        self._started = time.perf_counter()
+        self._lap_started = self._started
+
+    def lap(self, stage: str) -> None:
+        # Stages run back to back, so each one is timed from the end of the previous one.
+        now = time.perf_counter()
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + now - self._lap_started
+        self._lap_started = now
+
+    def check_cancelled(self) -> None:
+        if self.should_cancel is not None and self.should_cancel():
+            raise StatusComputationCancelled()
+
+    def finish(self) -> None:
+        self.total_seconds = time.perf_counter() - self._started
+        _render_history.append(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self.started_at,
+            "background": self.background,
+            "cache_hit": self.cache_hit,
+            "restored": self.restored,
+            "coalesced": self.coalesced,
+            "incremental": self.incremental,
+            "total_ms": self.total_seconds * 1000,
+            "stages_ms": {name: value * 1000 for name, value in self.stage_seconds.items()},
+            "decks": self.deck_count,
+            "hidden_decks": self.hidden_deck_count,
+            "queries": self.query_count,
+            "query_ms": self.query_seconds * 1000,
+            "badges": self.badge_count,
+            "updated_decks": self.updated_deck_count,
+        }
+
+
+@dataclass(slots=True)
+class RollupTotals:
+    rolled_up: bool
+    agg_unsuspended: List[int]
+    agg_suspended: List[int]
+    subtree_monitored: List[int]
+    subtree_problem: List[int]
+    subtree_limits: List[int]
+    subtree_avail: List[int]
+    descendant_monitored: List[int]
+    descendant_problem: List[int]
+    descendant_limits: List[int]
+    descendant_avail: List[int]
+
+
+def _normalize_config(loaded: object) -> dict:
+    config = dict(DEFAULT_CONFIG)
+    if isinstance(loaded, dict):
+        config.update(loaded)
+
+    config["use_regex_patterns"] = bool(config.get("use_regex_patterns", False))
+    config["include_patterns"] = _normalize_pattern_list(config.get("include_patterns", []))
+    config["exclude_patterns"] = _normalize_pattern_list(config.get("exclude_patterns", []))
+    config["fractional_scheduler_health_override"] = bool(
+        config.get("fractional_scheduler_health_override", False)
+    )
+    config["async_status_computation"] = bool(config.get("async_status_computation", False))
+    coalesce_ms = config.get("refresh_coalesce_ms", 250)
+    try:
+        coalesce_ms = int(coalesce_ms) if isinstance(coalesce_ms, (int, float, str)) else 250
+    except ValueError:
+        coalesce_ms = 250
+    config["refresh_coalesce_ms"] = min(max(coalesce_ms, 0), MAX_REFRESH_COALESCE_MS)
+    config["export_status_json"] = bool(config.get("export_status_json", False))
+    config["compact_tooltips"] = bool(config.get("compact_tooltips", False))
+    config["lazy_collapsed_subtrees"] = bool(config.get("lazy_collapsed_subtrees", False))
+    slow_query_ms = config.get("slow_query_ms", 200)
+    try:
+        slow_query_ms = int(slow_query_ms) if isinstance(slow_query_ms, (int, float, str)) else 200
+    except ValueError:
+        slow_query_ms = 200
+    config["slow_query_ms"] = min(max(slow_query_ms, 0), MAX_SLOW_QUERY_MS)
+    container_mode = str(config.get("container_deck_mode", CONTAINER_MODE_ANY))
+    if container_mode == "aggregate_children":
+        container_mode = CONTAINER_MODE_ANY
+    if container_mode not in {choice[0] for choice in CONTAINER_MODE_CHOICES}:
+        container_mode = CONTAINER_MODE_ANY
+    config["container_deck_mode"] = container_mode
+    return config
+
+
+def _config_fingerprint(config: dict) -> str:
+    payload = json.dumps(
+        {key: config[key] for key in STATUS_CONFIG_KEYS}, sort_keys=True, default=str
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _build_effective_config(config: dict) -> EffectiveConfig:
+    use_regex = bool(config["use_regex_patterns"])
+    include_patterns = tuple(config["include_patterns"])
+    exclude_patterns = tuple(config["exclude_patterns"])
+    return EffectiveConfig(
+        use_regex_patterns=use_regex,
+        include_patterns=include_patterns,
+        exclude_patterns=exclude_patterns,
+        container_deck_mode=config["container_deck_mode"],
+        fractional_scheduler_health_override=bool(config["fractional_scheduler_health_override"]),
+        async_status_computation=bool(config["async_status_computation"]),
+        refresh_coalesce_ms=int(config["refresh_coalesce_ms"]),
+        export_status_json=bool(config["export_status_json"]),
+        compact_tooltips=bool(config["compact_tooltips"]),
+        lazy_collapsed_subtrees=bool(config["lazy_collapsed_subtrees"]),
+        slow_query_ms=int(config["slow_query_ms"]),
+        include_matcher=PatternMatcher(include_patterns, use_regex),
+        exclude_matcher=PatternMatcher(exclude_patterns, use_regex),
+        fingerprint=_config_fingerprint(config),
+    )
+
+
+def _normalize_pattern_list(value: object) -> List[str]:
+    if isinstance(value, str):
+        items = value.splitlines()
+    elif isinstance(value, list):
+        items = [str(item) for item in value]
+    else:
+        return []
+
+    patterns: List[str] = []
+    for item in items:
+        pattern = item.strip()
+        if pattern and not pattern.startswith("#"):
+            patterns.append(pattern)
+    return patterns
+
+
+def _validate_patterns(patterns: List[str], use_regex: bool, label: str) -> Optional[str]:
+    if not use_regex:
+        return None
+    for pattern in patterns:
+        try:
+            re.compile(pattern, re.IGNORECASE)
+        except re.error as err:
+            return f"Invalid {label} regex `{pattern}`: {err}"
+    return None
+
+
+def _should_monitor_deck(info: DeckInfo, config: EffectiveConfig) -> bool:
+    return _should_monitor(info.name, info.is_filtered, config)
+
+
+def _should_monitor(name: str, is_filtered: bool, config: EffectiveConfig) -> bool:
+    if is_filtered:
+        return False
+
+    included = True
+    if config.include_patterns:
+        included = config.include_matcher.matches(name)
+    if not included:
+        return False
+    if config.exclude_patterns and config.exclude_matcher.matches(name):
+        return False
+    return True
+
+
+def _is_problematic(info: DeckInfo) -> bool:
+    return info.agg_status in (STATUS_LIMITS, STATUS_AVAIL)
+
+
+def _preset_new_limit(config: dict) -> Optional[int]:
+    per_day = config.get("new", {}).get("perDay")
+    if per_day is None:
+        return None
+    try:
+        return int(per_day)
+    except Exception:
+        return None
+
+
+def _deck_new_limit_override(deck: dict) -> Optional[int]:
+    for key in ("new_per_day", "newPerDay", "newLimit", "new_limit"):
+        if key in deck:
+            try:
+                return int(deck[key])
+            except Exception:
+                pass
+
+    limits = deck.get("limits")
+    if isinstance(limits, dict):
+        for key in ("new", "perDay", "new_per_day"):
+            if key in limits:
+                try:
+                    return int(limits[key])
+                except Exception:
+                    pass
+    return None
+
+
+def _compute_self_status(
+    new_limit: Optional[int], unsuspended_new: int, effective_new_count: int
+) -> str:
+    if effective_new_count > 0:
+        return STATUS_NORMAL
+    if new_limit is not None and new_limit <= 0 and unsuspended_new > 0:
+        return STATUS_LIMITS
+    if unsuspended_new <= 0:
+        return STATUS_AVAIL
+    return STATUS_NORMAL
+
+
+def _parent_name(deck_name: str) -> Optional[str]:
+    if "::" not in deck_name:
+        return None
+    return deck_name.rsplit("::", 1)[0]
+
+
+def _select_counted_decks(
+    decks: Iterable[Tuple[int, str, bool]], config: EffectiveConfig
+) -> Set[int]:
+    # Monitored decks need their card counts. Unmonitored parents that a monitored deck
+    # rolls up into only need theirs to tell whether they are containers; the rest never
+    # show a badge.
+    decks = list(decks)
+    did_by_name = {name: int(did) for did, name, _is_filtered in decks}
+    rolled_up = config.container_deck_mode != CONTAINER_MODE_DIRECT
+    counted: Set[int] = set()
+    for did, name, is_filtered in decks:
+        if not _should_monitor(name, is_filtered, config):
+            continue
+        counted.add(int(did))
+        parent_name = _parent_name(name) if rolled_up else None
+        while parent_name is not None:
+            parent_did = did_by_name.get(parent_name)
+            if parent_did is None or parent_did in counted:
+                break
+            counted.add(parent_did)
+            parent_name = _parent_name(parent_name)
+    return counted
+
+
+def _link_deck_infos(infos: List[DeckInfo], hierarchy: DeckHierarchy) -> None:
+    # Every later stage indexes infos by hierarchy slot, so a duplicate or missing name
+    # would silently attach every following deck to the wrong slot.
+    if len(infos) != len(hierarchy) or any(
+        info.name != name for info, name in zip(infos, hierarchy.names)
+    ):
+        raise ValueError("deck rows are not in hierarchy slot order")
+    for info, has_children in zip(infos, hierarchy.has_children):
+        info.has_children = has_children
+        info.is_container = info.counts_known and info.total_cards == 0 and has_children
+
+
+def _apply_monitoring(
+    infos: List[DeckInfo],
+    hierarchy: DeckHierarchy,
+    config: EffectiveConfig,
+    job: Optional[RenderJob] = None,
+    hidden: Iterable[HiddenDeck] = (),
+) -> RollupTotals:
+    if job is None:
+        job = RenderJob()
+    container_mode = config.container_deck_mode
+    count = len(infos)
+    totals = RollupTotals(
+        rolled_up=container_mode != CONTAINER_MODE_DIRECT,
+        agg_unsuspended=[0] * count,
+        agg_suspended=[0] * count,
+        subtree_monitored=[0] * count,
+        subtree_problem=[0] * count,
+        subtree_limits=[0] * count,
+        subtree_avail=[0] * count,
+        descendant_monitored=[0] * count,
+        descendant_problem=[0] * count,
+        descendant_limits=[0] * count,
+        descendant_avail=[0] * count,
+    )
+    agg_unsuspended = totals.agg_unsuspended
+    agg_suspended = totals.agg_suspended
+    subtree_monitored_counts = totals.subtree_monitored
+    subtree_problem_counts = totals.subtree_problem
+    subtree_limits_counts = totals.subtree_limits
+    subtree_avail_counts = totals.subtree_avail
+    descendant_monitored_counts = totals.descendant_monitored
+    descendant_problem_counts = totals.descendant_problem
+    descendant_limits_counts = totals.descendant_limits
+    descendant_avail_counts = totals.descendant_avail
+
+    for slot, info in enumerate(infos):
+        info.monitored = _should_monitor_deck(info, config)
+        info.direct_status = info.self_status if info.monitored and not info.is_container else None
+        info.descendant_status = None
+        info.has_monitored_descendants = False
+        if info.monitored:
+            agg_unsuspended[slot] = info.unsuspended_new
+            agg_suspended[slot] = info.suspended_new
+            if not info.is_container:
+                subtree_monitored_counts[slot] = 1
+        if info.direct_status == STATUS_LIMITS:
+            subtree_problem_counts[slot] = 1
+            subtree_limits_counts[slot] = 1
+        elif info.direct_status == STATUS_AVAIL:
+            subtree_problem_counts[slot] = 1
+            subtree_avail_counts[slot] = 1
+    job.lap("matching")
+
+    if totals.rolled_up:
+        # Decks under a collapsed row only feed that row's totals.
+        for deck in hidden:
+            unsuspended, suspended, monitored, problem, limits, avail = deck.contribution
+            slot = deck.owner
+            agg_unsuspended[slot] += unsuspended
+            agg_suspended[slot] += suspended
+            descendant_monitored_counts[slot] += monitored
+            descendant_problem_counts[slot] += problem
+            descendant_limits_counts[slot] += limits
+            descendant_avail_counts[slot] += avail
+            subtree_monitored_counts[slot] += monitored
+            subtree_problem_counts[slot] += problem
+            subtree_limits_counts[slot] += limits
+            subtree_avail_counts[slot] += avail
+
+        parents = hierarchy.parent
+        for slot in hierarchy.post_order:
+            parent = parents[slot]
+            if parent < 0:
+                continue
+            agg_unsuspended[parent] += agg_unsuspended[slot]
+            agg_suspended[parent] += agg_suspended[slot]
+            descendant_monitored_counts[parent] += subtree_monitored_counts[slot]
+            descendant_problem_counts[parent] += subtree_problem_counts[slot]
+            descendant_limits_counts[parent] += subtree_limits_counts[slot]
+            descendant_avail_counts[parent] += subtree_avail_counts[slot]
+            subtree_monitored_counts[parent] += subtree_monitored_counts[slot]
+            subtree_problem_counts[parent] += subtree_problem_counts[slot]
+            subtree_limits_counts[parent] += subtree_limits_counts[slot]
+            subtree_avail_counts[parent] += subtree_avail_counts[slot]
+
+    _derive_rollup_statuses(infos, range(count), totals, container_mode)
+    job.lap("rollup")
+    return totals
+
+
+def _derive_rollup_statuses(
+    infos: List[DeckInfo], slots: Iterable[int], totals: RollupTotals, container_mode: str
+) -> None:
+    agg_unsuspended = totals.agg_unsuspended
+    agg_suspended = totals.agg_suspended
+    subtree_monitored_counts = totals.subtree_monitored
+    descendant_monitored_counts = totals.descendant_monitored
+    descendant_problem_counts = totals.descendant_problem
+    descendant_limits_counts = totals.descendant_limits
+    descendant_avail_counts = totals.descendant_avail
+
+    for slot in slots:
+        info = infos[slot]
+        info.agg_has_monitored = subtree_monitored_counts[slot] > 0
+        info.agg_unsuspended_new = agg_unsuspended[slot]
+        info.agg_suspended_new = agg_suspended[slot]
+        if not totals.rolled_up:
+            info.agg_status = info.direct_status
+            continue
+
+        info.has_monitored_descendants = descendant_monitored_counts[slot] > 0
+        info.descendant_status = None
+        if container_mode in {CONTAINER_MODE_ANY, CONTAINER_MODE_HIDE}:
+            if descendant_limits_counts[slot]:
+                info.descendant_status = STATUS_LIMITS
+            elif descendant_avail_counts[slot]:
+                info.descendant_status = STATUS_AVAIL
+        elif container_mode == CONTAINER_MODE_ALL:
+            descendant_monitored = descendant_monitored_counts[slot]
+            if descendant_monitored > 0 and descendant_monitored == descendant_problem_counts[slot]:
+                if descendant_limits_counts[slot]:
+                    info.descendant_status = STATUS_LIMITS
+                elif descendant_avail_counts[slot]:
+                    info.descendant_status = STATUS_AVAIL
+
+        if info.direct_status == STATUS_LIMITS or info.descendant_status == STATUS_LIMITS:
+            info.agg_status = STATUS_LIMITS
+        elif info.direct_status == STATUS_AVAIL or info.descendant_status == STATUS_AVAIL:
+            info.agg_status = STATUS_AVAIL
+        else:
+            info.agg_status = None
+
+
+def _contribution(
+    monitored: bool,
+    is_container: bool,
+    direct_status: Optional[str],
+    unsuspended_new: int,
+    suspended_new: int,
+) -> Tuple[int, int, int, int, int, int]:
+    return (
+        unsuspended_new if monitored else 0,
+        suspended_new if monitored else 0,
+        1 if monitored and not is_container else 0,
+        1 if direct_status in (STATUS_LIMITS, STATUS_AVAIL) else 0,
+        1 if direct_status == STATUS_LIMITS else 0,
+        1 if direct_status == STATUS_AVAIL else 0,
+    )
+
+
+def _rollup_contribution(info: DeckInfo) -> Tuple[int, int, int, int, int, int]:
+    return _contribution(
+        info.monitored,
+        info.is_container,
+        info.direct_status,
+        info.unsuspended_new,
+        info.suspended_new,
+    )
+
+
+def _hidden_deck_contribution(deck: HiddenDeck) -> Tuple[int, int, int, int, int, int]:
+    is_container = deck.total_cards == 0 and deck.has_children
+    direct_status = deck.self_status if deck.monitored and not is_container else None
+    return _contribution(
+        deck.monitored, is_container, direct_status, deck.unsuspended_new, deck.suspended_new
+    )
+
+
+def _apply_rollup_delta(
+    totals: RollupTotals,
+    parents: List[int],
+    slot: int,
+    delta: Tuple[int, ...],
+    touched: Set[int],
+    from_descendant: bool = False,
+) -> None:
+    # from_descendant: the change is in a deck hidden under slot rather than in slot itself.
+    unsuspended, suspended, monitored, problem, limits, avail = delta
+    ancestor = slot
+    while ancestor >= 0:
+        totals.agg_unsuspended[ancestor] += unsuspended
+        totals.agg_suspended[ancestor] += suspended
+        totals.subtree_monitored[ancestor] += monitored
+        totals.subtree_problem[ancestor] += problem
+        totals.subtree_limits[ancestor] += limits
+        totals.subtree_avail[ancestor] += avail
+        if ancestor != slot or from_descendant:
+            totals.descendant_monitored[ancestor] += monitored
+            totals.descendant_problem[ancestor] += problem
+            totals.descendant_limits[ancestor] += limits
+            totals.descendant_avail[ancestor] += avail
+        touched.add(ancestor)
+        if not totals.rolled_up:
+            break
+        ancestor = parents[ancestor]
+
+
+def _should_show_badge(info: DeckInfo, config: EffectiveConfig) -> bool:
+    if not _is_problematic(info):
+        return False
+    container_mode = config.container_deck_mode
+    if info.is_container and container_mode in {CONTAINER_MODE_HIDE, CONTAINER_MODE_DIRECT}:
+        return False
+    return True
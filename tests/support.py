@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import importlib.util
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import types
+from html import escape
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+ADDON_MODULE_NAME = "notify_empty_decks"
+
+CARD_SCHEMA = """
+create table cards (
+  id integer primary key,
+  nid integer not null,
+  did integer not null,
+  odid integer not null default 0,
+  type integer not null,
+  queue integer not null,
+  mod integer not null default 0
+);
+"""
+
+PRESET_NEW_LIMITS = {1: 20, 2: 0, 3: 5}
+
+QT_NAMES = (
+    "QAction",
+    "QCheckBox",
+    "QComboBox",
+    "QDialog",
+    "QDialogButtonBox",
+    "QFormLayout",
+    "QHBoxLayout",
+    "QLabel",
+    "QPlainTextEdit",
+    "QPushButton",
+    "QSpinBox",
+    "QTimer",
+    "QVBoxLayout",
+)
+
+
+class TestDB:
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def scalar(self, sql: str, *args: Any) -> Any:
+        row = self.connection.execute(sql, args).fetchone()
+        return row[0] if row else None
+
+    def all(self, sql: str, *args: Any) -> List[List[Any]]:
+        return [list(row) for row in self.connection.execute(sql, args)]
+
+    def list(self, sql: str, *args: Any) -> List[Any]:
+        return [row[0] for row in self.connection.execute(sql, args)]
+
+
+class DeckTreeNode:
+    def __init__(self, deck_id: int, name: str, collapsed: bool) -> None:
+        self.deck_id = deck_id
+        self.name = name
+        self.collapsed = collapsed
+        self.new_count = 0
+        self.children: List[DeckTreeNode] = []
+
+
+class UndoStatus:
+    def __init__(self, redo: str = "") -> None:
+        self.undo = ""
+        self.redo = redo
+        self.last_step = 0
+
+
+class TestDecks:
+    def __init__(self, collection: TestCollection) -> None:
+        self.collection = collection
+
+    def all(self) -> List[Dict[str, Any]]:
+        return [dict(deck) for deck in self.collection.deck_dicts.values()]
+
+    def get(self, did: int, default: bool = True) -> Optional[Dict[str, Any]]:
+        deck = self.collection.deck_dicts.get(int(did))
+        return dict(deck) if deck else None
+
+    def all_config(self) -> List[Dict[str, Any]]:
+        return [
+            {"id": conf_id, "new": {"perDay": per_day}}
+            for conf_id, per_day in PRESET_NEW_LIMITS.items()
+        ]
+
+
+class TestScheduler:
+    def __init__(self, collection: TestCollection) -> None:
+        self.collection = collection
+        self.today = 100
+
+    def deck_due_tree(self) -> DeckTreeNode:
+        available = dict(
+            self.collection.db.all(
+                "select (case when odid then odid else did end), sum(type=0 and queue=0) "
+                "from cards group by 1"
+            )
+        )
+        root = DeckTreeNode(0, "", False)
+        nodes: Dict[str, DeckTreeNode] = {}
+        for deck in sorted(self.collection.deck_dicts.values(), key=lambda deck: deck["name"]):
+            name = deck["name"]
+            node = DeckTreeNode(deck["id"], name.rsplit("::", 1)[-1], deck["collapsed"])
+            if not deck["dyn"]:
+                limit = PRESET_NEW_LIMITS[deck["conf"]]
+                if deck.get("newLimit") is not None:
+                    limit = deck["newLimit"]
+                node.new_count = min(limit, int(available.get(deck["id"]) or 0))
+            nodes[name] = node
+            parent = name.rsplit("::", 1)[0] if "::" in name else ""
+            nodes.get(parent, root).children.append(node)
+        return root
+
+
+class TestCollection:
+    def __init__(self) -> None:
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.executescript(CARD_SCHEMA)
+        self.db = TestDB(self.connection)
+        self.decks = TestDecks(self)
+        self.sched = TestScheduler(self)
+        self.mod = 1_700_000_000_000
+        self.redo = ""
+        self.path: Optional[str] = None
+        self.deck_dicts: Dict[int, Dict[str, Any]] = {}
+
+    def undo_status(self) -> UndoStatus:
+        return UndoStatus(self.redo)
+
+    def add_deck(
+        self,
+        name: str,
+        conf: int = 1,
+        filtered: bool = False,
+        collapsed: bool = False,
+        new_limit: Optional[int] = None,
+    ) -> int:
+        did = 1_000 + len(self.deck_dicts)
+        deck: Dict[str, Any] = {
+            "id": did,
+            "name": name,
+            "dyn": 1 if filtered else 0,
+            "collapsed": collapsed,
+        }
+        if not filtered:
+            deck["conf"] = conf
+            deck["newLimit"] = new_limit
+        self.deck_dicts[did] = deck
+        return did
+
+    def add_cards(self, did: int, card_type: int, queue: int, count: int = 1) -> None:
+        first_id = self.db.scalar("select coalesce(max(id), 0) + 1 from cards")
+        self.connection.executemany(
+            "insert into cards (id, nid, did, type, queue) values (?, ?, ?, ?, ?)",
+            [
+                (card_id, card_id, did, card_type, queue)
+                for card_id in range(first_id, first_id + count)
+            ],
+        )
+
+
+class TestMainWindow:
+    def __init__(self, collection: TestCollection) -> None:
+        self.col = collection
+        self.state = "deckBrowser"
+        self.deckBrowser = None
+        self.taskman = None
+
+
+def build_collection(deck_count: int, depth: int, seed: int = 1) -> TestCollection:
+    # A random deck tree with a quarter of the decks collapsed and a mix of new, suspended
+    # and review cards, so every status shows up somewhere.
+    rng = random.Random(seed)
+    collection = TestCollection()
+    names: List[str] = []
+    while len(names) < deck_count:
+        parents = [name for name in names if name.count("::") + 1 < depth]
+        parent = rng.choice(parents) if parents and rng.random() < 0.8 else None
+        name = f"{parent}::Deck {len(names)}" if parent else f"Deck {len(names)}"
+        names.append(name)
+    for name in names:
+        did = collection.add_deck(
+            name,
+            conf=rng.choice((1, 1, 2, 3)),
+            filtered=rng.random() < 0.03,
+            collapsed=rng.random() < 0.25,
+        )
+        if collection.deck_dicts[did]["dyn"] or rng.random() < 0.2:
+            continue
+        suspend_new = rng.random() < 0.15
+        for _ in range(rng.randint(1, 20)):
+            card_type = rng.choice((0, 0, 1, 2))
+            queue = -1 if card_type == 0 and (suspend_new or rng.random() < 0.2) else card_type
+            collection.add_cards(did, card_type, queue)
+    return collection
+
+
+def deck_browser_html(collection: TestCollection, visible_only: bool = False) -> str:
+    decks = sorted(collection.deck_dicts.values(), key=lambda deck: deck["name"])
+    if visible_only:
+        # Like Anki, leave out the rows under a collapsed deck.
+        hidden = set()
+        collapsed = {deck["name"] for deck in decks if deck["collapsed"]}
+        for deck in decks:
+            parent = deck["name"].rsplit("::", 1)[0] if "::" in deck["name"] else None
+            if parent in hidden or parent in collapsed:
+                hidden.add(deck["name"])
+        decks = [deck for deck in decks if deck["name"] not in hidden]
+    rows = ["<table cellspacing=0 cellpadding=3>"]
+    for deck in decks:
+        did = deck["id"]
+        rows.append(
+            f"<tr class='deck' id='{did}'><td class=decktd colspan=5>"
+            f'<a class="deck "\n        href=# onclick="return pycmd(\'open:{did}\')">'
+            f"{escape(deck['name'].rsplit('::', 1)[-1])} </a></td></tr>"
+        )
+    rows.append("</table>")
+    return "\n".join(rows)
+
+
+def _install_aqt_stubs(mw: object) -> None:
+    class Widget:
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            pass
+
+        def __getattr__(self, name: str) -> Any:
+            return lambda *args, **kwargs: None
+
+    class Hooks:
+        def __getattr__(self, name: str) -> List[Any]:
+            hook: List[Any] = []
+            setattr(self, name, hook)
+            return hook
+
+    aqt = types.ModuleType("aqt")
+    aqt.gui_hooks = Hooks()  # type: ignore[attr-defined]
+    aqt.mw = mw  # type: ignore[attr-defined]
+    qt = types.ModuleType("aqt.qt")
+    for name in QT_NAMES:
+        setattr(qt, name, type(name, (Widget,), {}))
+    utils = types.ModuleType("aqt.utils")
+    utils.showInfo = lambda *args, **kwargs: None  # type: ignore[attr-defined]
+    utils.tooltip = lambda *args, **kwargs: None  # type: ignore[attr-defined]
+    sys.modules.update({"aqt": aqt, "aqt.qt": qt, "aqt.utils": utils})
+
+
+def load_addon(
+    collection: TestCollection, tmpdir: str, config: Optional[Dict[str, Any]] = None
+) -> types.ModuleType:
+    # Every file the add-on writes goes to tmpdir instead of the repo checkout.
+    for name in list(sys.modules):
+        if name == ADDON_MODULE_NAME or name.startswith(f"{ADDON_MODULE_NAME}."):
+            del sys.modules[name]
+    slow_query_logger = logging.getLogger(f"{ADDON_MODULE_NAME}.slow_queries")
+    for handler in list(slow_query_logger.handlers):
+        slow_query_logger.removeHandler(handler)
+        handler.close()
+
+    _install_aqt_stubs(TestMainWindow(collection))
+    spec = importlib.util.spec_from_file_location(
+        ADDON_MODULE_NAME, ROOT / "__init__.py", submodule_search_locations=[str(ROOT)]
+    )
+    if spec is None or spec.loader is None:
+        raise ImportError(f"cannot load add-on from {ROOT}")
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules[ADDON_MODULE_NAME] = addon
+    spec.loader.exec_module(addon)
+
+    addon.CONFIG_PATH = os.path.join(tmpdir, "config.json")
+    addon.DIAGNOSTICS_PATH = os.path.join(tmpdir, "render_diagnostics.json")
+    addon.SLOW_QUERY_LOG_PATH = os.path.join(tmpdir, "slow_queries.log")
+    addon.USER_FILES_DIR = os.path.join(tmpdir, "user_files")
+    addon.STATUS_EXPORT_PATH = os.path.join(addon.USER_FILES_DIR, "deck_status.json")
+    with open(addon.CONFIG_PATH, "w", encoding="utf-8") as handle:
+        json.dump(config or {}, handle)
+    addon._invalidate_config_cache()
+    return addon
+
+
+def render_deck_browser(addon: types.ModuleType, collection: TestCollection) -> str:
+    # Like Anki's deck browser: build the due tree, then decorate the visible rows.
+    deck_browser = types.SimpleNamespace(
+        _render_data=types.SimpleNamespace(tree=collection.sched.deck_due_tree())
+    )
+    content = types.SimpleNamespace(tree=deck_browser_html(collection, visible_only=True), stats="")
+    addon._decorate_deck_browser(deck_browser, content)
+    return content.tree
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import audit
+
+CARDS_SQL = (
+    "create table cards (id integer primary key, did integer, odid integer, type integer, "
+    "queue integer)"
+)
+
+
+def varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def field(number: int, value) -> bytes:
+    if isinstance(value, bytes):
+        return varint(number << 3 | 2) + varint(len(value)) + value
+    return varint(number << 3) + varint(value)
+
+
+def add_cards(connection: sqlite3.Connection, did: int, card_type: int, queue: int, count: int):
+    connection.executemany(
+        "insert into cards (did, odid, type, queue) values (?, 0, ?, ?)",
+        [(did, card_type, queue)] * count,
+    )
+
+
+def write_schema11(path: Path) -> None:
+    decks = {
+        "1": {"id": 1, "name": "Default", "conf": 1, "dyn": 0},
+        "10": {"id": 10, "name": "Spanish", "conf": 2, "dyn": 0},
+        "11": {"id": 11, "name": "Spanish::Verbs", "conf": 1, "dyn": 0, "newLimit": 0},
+        "12": {"id": 12, "name": "Cram", "dyn": 1},
+    }
+    dconf = {"1": {"new": {"perDay": 20}}, "2": {"new": {"perDay": 0}}}
+    connection = sqlite3.connect(path)
+    connection.execute("create table col (decks text, dconf text)")
+    connection.execute("insert into col values (?, ?)", (json.dumps(decks), json.dumps(dconf)))
+    connection.execute(CARDS_SQL)
+    add_cards(connection, 1, card_type=0, queue=0, count=3)
+    add_cards(connection, 11, card_type=0, queue=0, count=2)
+    add_cards(connection, 11, card_type=0, queue=-1, count=1)
+    connection.commit()
+    connection.close()
+
+
+def write_schema18(path: Path) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute("create table decks (id integer primary key, name text, kind blob)")
+    connection.execute("create table deck_config (id integer primary key, config blob)")
+    connection.execute(CARDS_SQL)
+    normal = audit.DECK_KIND_NORMAL
+    connection.executemany(
+        "insert into decks values (?, ?, ?)",
+        [
+            (1, "Default", field(normal, field(audit.NORMAL_DECK_CONFIG_ID, 1))),
+            (20, "French", field(normal, field(audit.NORMAL_DECK_CONFIG_ID, 2))),
+            (
+                21,
+                "French\x1fNouns",
+                field(
+                    normal,
+                    field(audit.NORMAL_DECK_CONFIG_ID, 1) + field(audit.NORMAL_DECK_NEW_LIMIT, 300),
+                ),
+            ),
+            (22, "Filtered", field(audit.DECK_KIND_FILTERED, b"")),
+        ],
+    )
+    connection.executemany(
+        "insert into deck_config values (?, ?)",
+        [
+            (1, field(audit.DECK_CONFIG_NEW_PER_DAY, 20)),
+            # proto3 drops new_per_day = 0 from the encoded message.
+            (2, b""),
+        ],
+    )
+    add_cards(connection, 20, card_type=0, queue=0, count=4)
+    add_cards(connection, 21, card_type=0, queue=-1, count=2)
+    connection.commit()
+    connection.close()
+
+
+class ProtobufFieldsTest(unittest.TestCase):
+    def test_decodes_varints_and_nested_messages(self) -> None:
+        nested = field(audit.NORMAL_DECK_NEW_LIMIT, 300)
+        data = field(1, 5) + field(2, nested) + field(3, 2**40)
+        fields = audit._protobuf_fields(data)
+        self.assertEqual({1: 5, 2: nested, 3: 2**40}, fields)
+        self.assertEqual({audit.NORMAL_DECK_NEW_LIMIT: 300}, audit._protobuf_fields(nested))
+
+    def test_rejects_unsupported_wire_types(self) -> None:
+        with self.assertRaises(ValueError):
+            audit._protobuf_fields(varint(1 << 3 | 3))
+
+
+class AuditCollectionTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        self.schema11 = self.root / "legacy" / "collection.anki2"
+        self.schema18 = self.root / "current" / "collection.anki2"
+        self.schema11.parent.mkdir()
+        self.schema18.parent.mkdir()
+        write_schema11(self.schema11)
+        write_schema18(self.schema18)
+        self.settings = audit._normalize_config(None)
+
+    def audit_rows(self, path: Path) -> dict:
+        _path, rows, error = audit._audit_collection(str(path), self.settings)
+        self.assertIsNone(error)
+        return {row["name"]: row for row in rows}
+
+    def test_schema11_limits_and_filtered_flags(self) -> None:
+        rows = self.audit_rows(self.schema11)
+        self.assertEqual(["Cram", "Default", "Spanish", "Spanish::Verbs"], sorted(rows))
+
+        self.assertEqual(
+            (20, "config"), (rows["Default"]["new_limit"], rows["Default"]["limit_source"])
+        )
+        self.assertEqual("normal", rows["Default"]["self_status"])
+        self.assertEqual(
+            (0, "config"), (rows["Spanish"]["new_limit"], rows["Spanish"]["limit_source"])
+        )
+
+        verbs = rows["Spanish::Verbs"]
+        self.assertEqual((0, "deck"), (verbs["new_limit"], verbs["limit_source"]))
+        self.assertEqual((2, 1), (verbs["unsuspended_new"], verbs["suspended_new"]))
+        self.assertEqual("limits", verbs["self_status"])
+        self.assertEqual(2, rows["Spanish"]["agg_unsuspended_new"])
+
+        self.assertTrue(rows["Cram"]["is_filtered"])
+        self.assertFalse(rows["Default"]["is_filtered"])
+        # Filtered decks have no preset and fall back to the default one.
+        self.assertEqual(20, rows["Cram"]["new_limit"])
+
+    def test_schema18_limits_and_filtered_flags(self) -> None:
+        rows = self.audit_rows(self.schema18)
+        self.assertEqual(["Default", "Filtered", "French", "French::Nouns"], sorted(rows))
+
+        french = rows["French"]
+        # The preset's encoded config omits new_per_day, which proto3 means is 0.
+        self.assertEqual((0, "config"), (french["new_limit"], french["limit_source"]))
+        self.assertEqual("limits", french["self_status"])
+
+        nouns = rows["French::Nouns"]
+        self.assertEqual((300, "deck"), (nouns["new_limit"], nouns["limit_source"]))
+        self.assertEqual((0, 2), (nouns["unsuspended_new"], nouns["suspended_new"]))
+        self.assertEqual("availability", nouns["self_status"])
+
+        self.assertTrue(rows["Filtered"]["is_filtered"])
+        self.assertFalse(rows["French"]["is_filtered"])
+        self.assertEqual(set(audit.AUDIT_FIELDS), set(french))
+
+    def test_unreadable_collections_report_an_error(self) -> None:
+        missing = self.root / "missing.anki2"
+        path, rows, error = audit._audit_collection(str(missing), self.settings)
+        self.assertEqual((str(missing), []), (path, rows))
+        self.assertIsNotNone(error)
+
+    def test_main_audits_a_directory_with_a_process_pool(self) -> None:
+        output = self.root / "audit.jsonl"
+        status = audit.main([str(self.root), "--jobs", "2", "--output", str(output)])
+        self.assertEqual(0, status)
+
+        rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+        # Collections come out in path order, whichever worker finished first.
+        self.assertEqual(
+            [str(self.schema18)] * 4 + [str(self.schema11)] * 4,
+            [row["collection"] for row in rows],
+        )
+        expected = [
+            row
+            for path in (self.schema18, self.schema11)
+            for row in sorted(self.audit_rows(path).values(), key=lambda row: row["name"])
+        ]
+        self.assertEqual(expected, rows)
+
+    def test_problems_only_csv(self) -> None:
+        output = self.root / "audit.csv"
+        audit.main(
+            [str(self.schema11), "--format", "csv", "--problems-only", "--output", str(output)]
+        )
+        lines = output.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(",".join(audit.AUDIT_FIELDS), lines[0])
+        names = [line.split(",")[2] for line in lines[1:]]
+        self.assertIn("Spanish::Verbs", names)
+        self.assertNotIn("Default", names)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import tempfile
+import types
+import unittest
+from concurrent.futures import Future
+
+from support import build_collection, deck_browser_html, load_addon
+
+CARD_CHANGES = types.SimpleNamespace(card=True, deck=False, deck_config=False)
+
+
+class TaskManager:
+    def __init__(self) -> None:
+        self.queued: list = []
+
+    def run_in_background(self, task, on_done) -> None:
+        self.queued.append((task, on_done))
+
+    def run_task(self) -> Future:
+        # The task runs "off the main thread"; its done callback is left to the caller.
+        task, _on_done = self.queued[0]
+        future: Future = Future()
+        try:
+            future.set_result(task())
+        except Exception as err:
+            future.set_exception(err)
+        return future
+
+    def finish_task(self, future: Future) -> None:
+        _task, on_done = self.queued.pop(0)
+        on_done(future)
+
+
+class BackgroundComputationTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.collection = build_collection(120, depth=3)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.addon = load_addon(
+            self.collection,
+            tmpdir.name,
+            {"async_status_computation": True, "refresh_coalesce_ms": 0},
+        )
+        self.taskman = self.addon.mw.taskman = TaskManager()
+        self.patched: list = []
+        self.deck_browser = types.SimpleNamespace(
+            _render_data=types.SimpleNamespace(tree=self.collection.sched.deck_due_tree()),
+            web=types.SimpleNamespace(eval=self.patched.append),
+        )
+
+    def render(self) -> None:
+        content = types.SimpleNamespace(tree=deck_browser_html(self.collection), stats="")
+        self.addon._decorate_deck_browser(self.deck_browser, content)
+
+    def test_caches_are_only_published_from_the_done_callback(self) -> None:
+        self.render()
+        future = self.taskman.run_task()
+        self.assertIsNone(self.addon._status_snapshot)
+        self.assertIsNone(self.addon._hierarchy_cache)
+        self.assertIsNone(self.addon._due_tree_cache)
+        self.assertIsNone(self.addon._render_cache.key)
+
+        self.taskman.finish_task(future)
+        self.assertIsNotNone(self.addon._status_snapshot)
+        self.assertIs(self.addon._status_snapshot.hierarchy, self.addon._hierarchy_cache)
+        self.assertIsNotNone(self.addon._due_tree_cache)
+        self.assertEqual(future.result().badges_by_did, self.addon._render_cache.badges_by_did)
+        self.assertEqual(1, len(self.patched))
+
+    def test_superseded_computation_hands_back_its_changes(self) -> None:
+        self.render()
+        self.taskman.finish_task(self.taskman.run_task())
+        self.collection.mod += 1
+        self.addon._on_operation_did_execute(CARD_CHANGES, None)
+        snapshot = self.addon._status_snapshot
+
+        self.render()
+        self.assertFalse(self.addon._pending_changes.cards)
+        # A newer render supersedes the computation before it has taken the snapshot.
+        self.addon._status_generation += 1
+        future = self.taskman.run_task()
+        self.assertIsInstance(future.exception(), self.addon.StatusComputationCancelled)
+        self.taskman.finish_task(future)
+
+        self.assertTrue(self.addon._pending_changes.cards)
+        self.assertIs(snapshot, self.addon._status_snapshot)
+        self.assertEqual(1, len(self.patched))
+
+    def test_warm_up_publishes_nothing_once_cancelled(self) -> None:
+        self.addon.mw.state = "overview"
+        self.assertTrue(self.addon._start_profile_warm_up())
+        future = self.taskman.run_task()
+        self.assertIsNone(self.addon._status_snapshot)
+        self.assertIsNone(self.addon._hierarchy_cache)
+
+        # The profile closes after the warm-up computed its badges but before on_done ran.
+        self.addon._on_profile_will_close()
+        self.taskman.finish_task(future)
+        self.assertIsNone(self.addon._status_snapshot)
+        self.assertIsNone(self.addon._hierarchy_cache)
+        self.assertIsNone(self.addon._render_cache.key)
+        self.assertTrue(self.addon._pending_changes.full_rebuild)
+        self.assertEqual(1, self.addon._profile_warm_up.superseded)
+
+    def test_warm_up_publishes_from_the_done_callback(self) -> None:
+        self.addon.mw.state = "overview"
+        self.assertTrue(self.addon._start_profile_warm_up())
+        future = self.taskman.run_task()
+        self.assertIsNone(self.addon._due_tree_cache)
+        self.taskman.finish_task(future)
+        self.assertIsNotNone(self.addon._status_snapshot)
+        self.assertIsNotNone(self.addon._due_tree_cache)
+        self.assertFalse(self.addon._pending_changes.full_rebuild)
+        self.assertEqual(1, self.addon._profile_warm_up.completed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import tempfile
+import threading
+import types
+import unittest
+
+from support import build_collection, load_addon
+
+
+class FractionalHealthNotificationTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.collection = build_collection(40, depth=2)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.addon = load_addon(self.collection, tmpdir.name, {"refresh_coalesce_ms": 250})
+        self.main_thread_calls: list = []
+        self.timers: list = []
+        self.refreshes: list = []
+        mw = self.addon.mw
+        mw.taskman = types.SimpleNamespace(run_on_main=self.main_thread_calls.append)
+        mw.progress = types.SimpleNamespace(
+            single_shot=lambda delay_ms, callback, _track: self.timers.append(callback)
+        )
+        mw.deckBrowser = types.SimpleNamespace(refresh=lambda: self.refreshes.append(True))
+
+    def notify_from_worker(self) -> None:
+        worker = threading.Thread(target=self.addon._on_fractional_health_changed)
+        worker.start()
+        worker.join()
+
+    def test_notifications_are_counted_on_the_main_thread(self) -> None:
+        self.notify_from_worker()
+        self.assertEqual(0, self.addon._fractional_health.notifications)
+        for callback in self.main_thread_calls:
+            callback()
+        self.assertEqual(1, self.addon._fractional_health.notifications)
+
+    def test_a_burst_of_notifications_schedules_one_trailing_refresh(self) -> None:
+        for _ in range(5):
+            self.notify_from_worker()
+        for callback in self.main_thread_calls:
+            callback()
+        self.assertEqual(5, self.addon._fractional_health.notifications)
+        self.assertEqual([self.addon._on_trailing_refresh], self.timers)
+        self.assertEqual([], self.refreshes)
+
+
+if __name__ == "__main__":
+    unittest.main()
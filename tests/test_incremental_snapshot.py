@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import dataclasses
+import random
+import tempfile
+import time
+import types
+import unittest
+
+from support import build_collection, load_addon
+
+CARD_CHANGES = types.SimpleNamespace(card=True, deck=False, deck_config=False)
+
+
+class IncrementalSnapshotTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.collection = build_collection(400, depth=3)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        config = {"include_patterns": ["*"]}
+        # The reference add-on never keeps a snapshot, so it always recomputes in full.
+        self.reference = load_addon(self.collection, tmpdir.name, config)
+        self.addon = load_addon(self.collection, tmpdir.name, config)
+        self.rng = random.Random(7)
+        self.compute()
+
+    def compute(self):
+        job = self.addon.RenderJob()
+        badges_by_did = self.addon._compute_badges(
+            self.addon._get_config(), self.collection.sched.deck_due_tree(), job
+        )
+        snapshot = self.addon._take_status_snapshot()
+        infos = [dataclasses.astuple(info) for info in snapshot.infos]
+        self.addon._publish_status_snapshot(snapshot)
+        return job, badges_by_did, infos
+
+    def assert_matches_full_recompute(self, label: str):
+        job, badges_by_did, infos = self.compute()
+        self.reference._take_status_snapshot()
+        expected = self.reference._compute_badges(
+            self.reference._get_config(), self.collection.sched.deck_due_tree()
+        )
+        expected_infos = [
+            dataclasses.astuple(info) for info in self.reference._take_status_snapshot().infos
+        ]
+        self.assertEqual(expected, badges_by_did, label)
+        self.assertEqual(expected_infos, infos, label)
+        return job
+
+    def card_ids(self, where: str) -> list:
+        return self.collection.db.list(f"select id from cards where {where}")
+
+    def apply(self, sql: str, *args: object, undo: bool = False) -> None:
+        self.collection.connection.execute(sql, args)
+        self.collection.mod += 1
+        self.collection.redo = "Suspend" if undo else ""
+        self.addon._on_operation_did_execute(CARD_CHANGES, None)
+
+    def suspend(self, count: int) -> None:
+        for card_id in self.rng.sample(self.card_ids("type=0 and queue=0"), count):
+            self.apply("update cards set queue=-1, mod=? where id=?", int(time.time()), card_id)
+
+    def test_suspending_cards_patches_the_snapshot(self) -> None:
+        self.suspend(5)
+        job = self.assert_matches_full_recompute("suspend")
+        self.assertTrue(job.incremental)
+        self.assertGreater(job.updated_deck_count, 0)
+
+        unsuspend_ids = self.card_ids("type=0 and queue=-1")[:4]
+        for card_id in unsuspend_ids:
+            self.apply("update cards set queue=0, mod=? where id=?", int(time.time()), card_id)
+        self.assertTrue(self.assert_matches_full_recompute("unsuspend").incremental)
+
+    def test_moves_and_deletes_fall_back_when_totals_do_not_add_up(self) -> None:
+        # Neither the old deck of a moved card nor a deleted card shows up in cards.mod.
+        home_dids = [did for did, deck in self.collection.deck_dicts.items() if not deck["dyn"]]
+        card_id = self.rng.choice(self.card_ids("odid=0"))
+        self.apply(
+            "update cards set did=?, mod=? where id=?",
+            self.rng.choice(home_dids),
+            int(time.time()),
+            card_id,
+        )
+        self.assertFalse(self.assert_matches_full_recompute("move").incremental)
+
+        self.apply("delete from cards where id=?", self.rng.choice(self.card_ids("1")))
+        self.assertFalse(self.assert_matches_full_recompute("delete").incremental)
+
+    def test_undo_and_the_operation_after_it_rebuild(self) -> None:
+        card_id = self.rng.choice(self.card_ids("type=0 and queue=0"))
+        self.apply("update cards set queue=-1, mod=? where id=?", int(time.time()), card_id)
+        self.assertTrue(self.assert_matches_full_recompute("suspend").incremental)
+
+        # Undo restores the card with its old modification time.
+        self.apply("update cards set queue=0, mod=0 where id=?", card_id, undo=True)
+        self.assertFalse(self.assert_matches_full_recompute("undo").incremental)
+        self.apply("update cards set queue=-1, mod=? where id=?", int(time.time()), card_id)
+        self.assertFalse(self.assert_matches_full_recompute("redo").incremental)
+
+        self.suspend(2)
+        self.assertTrue(self.assert_matches_full_recompute("suspend after redo").incremental)
+
+    def test_mixed_operations_match_a_full_recompute(self) -> None:
+        home_dids = [did for did, deck in self.collection.deck_dicts.items() if not deck["dyn"]]
+        incremental_steps = 0
+        for step in range(40):
+            kind = self.rng.choice(("suspend", "unsuspend", "move", "delete", "undo"))
+            now = int(time.time())
+            if kind == "suspend":
+                self.suspend(3)
+            elif kind == "unsuspend":
+                for card_id in self.card_ids("queue=-1")[:3]:
+                    self.apply("update cards set queue=type, mod=? where id=?", now, card_id)
+            elif kind == "move":
+                card_id = self.rng.choice(self.card_ids("odid=0"))
+                did = self.rng.choice(home_dids)
+                self.apply("update cards set did=?, mod=? where id=?", did, now, card_id)
+            elif kind == "delete":
+                self.apply("delete from cards where id=?", self.rng.choice(self.card_ids("1")))
+            else:
+                card_id = self.rng.choice(self.card_ids("1"))
+                self.apply(
+                    "update cards set queue=case when queue=-1 then type else -1 end, mod=0 "
+                    "where id=?",
+                    card_id,
+                    undo=True,
+                )
+            job = self.assert_matches_full_recompute(f"step {step}: {kind}")
+            incremental_steps += job.incremental
+        self.assertGreater(incremental_steps, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
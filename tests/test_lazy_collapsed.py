@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+
+from support import build_collection, load_addon, render_deck_browser
+
+
+class LazyCollapsedSubtreesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.collection = build_collection(600, depth=8)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.addon = load_addon(
+            self.collection,
+            tmpdir.name,
+            {"lazy_collapsed_subtrees": True, "refresh_coalesce_ms": 0},
+        )
+
+    def render(self) -> str:
+        return render_deck_browser(self.addon, self.collection)
+
+    def badge_count(self, page: str) -> int:
+        return page.count('class="notify-empty-decks-badge ')
+
+    def test_expanding_decks_before_the_collection_changes(self) -> None:
+        collapsed = [deck for deck in self.collection.deck_dicts.values() if deck["collapsed"]]
+        self.assertTrue(collapsed)
+        before = self.render()
+
+        # Anki re-renders the expanded tree before the collapse op bumps col.mod.
+        for deck in collapsed:
+            deck["collapsed"] = False
+        expanded = self.render()
+        self.assertFalse(self.addon._render_history[-1].cache_hit)
+        self.assertEqual(0, self.addon._render_history[-1].hidden_deck_count)
+
+        self.collection.mod += 1
+        self.addon._render_cache.clear()
+        self.addon._take_status_snapshot()
+        self.assertEqual(self.render(), expanded)
+        self.assertGreater(self.badge_count(expanded), self.badge_count(before))
+
+    def test_expanded_children_match_an_eager_render(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            eager = load_addon(self.collection, tmpdir, {"refresh_coalesce_ms": 0})
+            before = self.render()
+            self.assertGreater(self.addon._render_history[-1].hidden_deck_count, 0)
+
+            # Expand every collapsed row that is itself visible.
+            expanded = set()
+            for deck in self.collection.deck_dicts.values():
+                if deck["collapsed"] and f"open:{deck['id']}'" in before:
+                    deck["collapsed"] = False
+                    expanded.add(deck["name"])
+            children = [
+                deck["id"]
+                for deck in self.collection.deck_dicts.values()
+                if deck["name"].rsplit("::", 1)[0] in expanded and "::" in deck["name"]
+            ]
+            self.assertTrue(children)
+
+            page = self.render()
+            self.assertEqual(render_deck_browser(eager, self.collection), page)
+        # The newly visible children are rendered, and some of them carry badges.
+        self.assertTrue(all(f"open:{did}'" in page for did in children))
+        self.assertGreater(self.badge_count(page), self.badge_count(before))
+
+    def test_unchanged_rows_still_hit_the_cache(self) -> None:
+        first = self.render()
+        self.assertEqual(self.render(), first)
+        self.assertTrue(self.addon._render_history[-1].cache_hit)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import tempfile
+import types
+import unittest
+
+from support import build_collection, deck_browser_html, load_addon
+
+CARD_CHANGES = types.SimpleNamespace(card=True, deck=False, deck_config=False)
+
+
+class RefreshCoalescingTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.collection = build_collection(80, depth=3)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.addon = load_addon(self.collection, tmpdir.name, {"refresh_coalesce_ms": 60_000})
+        self.timers: list = []
+        self.patched: list = []
+        mw = self.addon.mw
+        mw.progress = types.SimpleNamespace(
+            single_shot=lambda delay_ms, callback, _track: self.timers.append(callback)
+        )
+        mw.deckBrowser = types.SimpleNamespace(
+            _render_data=None, web=types.SimpleNamespace(eval=self.patched.append)
+        )
+
+    def render(self) -> None:
+        deck_browser = self.addon.mw.deckBrowser
+        deck_browser._render_data = types.SimpleNamespace(
+            tree=self.collection.sched.deck_due_tree()
+        )
+        content = types.SimpleNamespace(tree=deck_browser_html(self.collection), stats="")
+        self.addon._decorate_deck_browser(deck_browser, content)
+
+    def burst(self, renders: int) -> None:
+        for _ in range(renders):
+            self.collection.connection.execute(
+                "update cards set queue=-1 where id=(select min(id) from cards where queue=0)"
+            )
+            self.collection.mod += 1
+            self.addon._on_operation_did_execute(CARD_CHANGES, None)
+            self.render()
+
+    def saved_computations(self) -> int:
+        return self.addon._render_diagnostics()["render_cache"]["saved_computations"]
+
+    def test_burst_followed_by_a_trailing_refresh(self) -> None:
+        self.render()
+        self.burst(5)
+        self.assertEqual(5, self.addon._render_cache.coalesced)
+        self.assertEqual(1, len(self.timers))
+        self.assertEqual(0, self.saved_computations())
+
+        # The trailing step recomputes once in place of the five coalesced renders.
+        self.timers.pop()()
+        self.assertEqual(1, len(self.patched))
+        self.assertEqual(4, self.saved_computations())
+
+    def test_trailing_step_without_a_computation_saves_every_render(self) -> None:
+        self.render()
+        self.burst(3)
+        # Leaving the deck browser means the stale badges are never recomputed.
+        self.addon.mw.state = "overview"
+        self.timers.pop()()
+        self.assertEqual([], self.patched)
+        self.assertEqual(3, self.saved_computations())
+
+
+if __name__ == "__main__":
+    unittest.main()
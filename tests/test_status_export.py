@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+
+from support import TestCollection, load_addon, render_deck_browser
+
+
+class StatusExportTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.collection = TestCollection()
+        self.monitored = self.collection.add_deck("Languages::Spanish", conf=2)
+        self.parent = self.collection.add_deck("Languages")
+        self.other = self.collection.add_deck("Music")
+        self.collection.add_cards(self.monitored, card_type=0, queue=0, count=4)
+        self.collection.add_cards(self.other, card_type=0, queue=-1, count=3)
+        # Enough unmonitored decks that only the monitored ones are counted.
+        for index in range(10):
+            self.collection.add_deck(f"Archive {index}")
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.addon = load_addon(
+            self.collection,
+            tmpdir.name,
+            {"export_status_json": True, "include_patterns": ["Languages::*"]},
+        )
+
+    def exported_rows(self) -> dict:
+        render_deck_browser(self.addon, self.collection)
+        with open(self.addon.STATUS_EXPORT_PATH, encoding="utf-8") as handle:
+            data = json.load(handle)
+        return {row[0]: dict(zip(data["fields"], row)) for row in data["decks"]}
+
+    def test_uncounted_decks_export_nulls_instead_of_zero_counts(self) -> None:
+        rows = self.exported_rows()
+        self.assertEqual(len(self.collection.deck_dicts), len(rows))
+
+        monitored = rows[self.monitored]
+        self.assertTrue(monitored["monitored"])
+        self.assertTrue(monitored["counted"])
+        self.assertEqual(4, monitored["unsuspended_new"])
+        self.assertEqual("limits", monitored["self_status"])
+
+        # The parent is counted because the monitored deck rolls up into it.
+        self.assertTrue(rows[self.parent]["counted"])
+        self.assertEqual(0, rows[self.parent]["unsuspended_new"])
+
+        other = rows[self.other]
+        self.assertFalse(other["monitored"])
+        self.assertFalse(other["counted"])
+        self.assertIsNone(other["self_status"])
+        self.assertIsNone(other["unsuspended_new"])
+        self.assertIsNone(other["suspended_new"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from status_model import STATUS_NORMAL, DeckHierarchy, DeckInfo, _link_deck_infos
+
+
+def deck_info(did: int, name: str, total_cards: int = 0) -> DeckInfo:
+    return DeckInfo(
+        did=did,
+        name=name,
+        is_filtered=False,
+        total_cards=total_cards,
+        new_limit=20,
+        limit_source="config",
+        unsuspended_new=0,
+        suspended_new=0,
+        effective_new_count=0,
+        self_status=STATUS_NORMAL,
+    )
+
+
+class LinkDeckInfosTest(unittest.TestCase):
+    def test_links_rows_in_slot_order(self) -> None:
+        infos = [deck_info(1, "A"), deck_info(2, "A::B", total_cards=3), deck_info(3, "C")]
+        _link_deck_infos(infos, DeckHierarchy(tuple(info.name for info in infos)))
+        self.assertEqual([True, False, False], [info.has_children for info in infos])
+        self.assertEqual([True, False, False], [info.is_container for info in infos])
+
+    def test_uncounted_decks_are_not_containers(self) -> None:
+        # Their zero card counts are placeholders, not an empty parent deck.
+        infos = [deck_info(1, "A"), deck_info(2, "A::B", total_cards=3)]
+        infos[0].counts_known = False
+        _link_deck_infos(infos, DeckHierarchy(tuple(info.name for info in infos)))
+        self.assertTrue(infos[0].has_children)
+        self.assertFalse(infos[0].is_container)
+
+    def test_rejects_rows_that_do_not_line_up_with_the_slots(self) -> None:
+        # A duplicated name collapses into one slot and would shift every later row.
+        infos = [deck_info(1, "A"), deck_info(2, "A"), deck_info(3, "A::B"), deck_info(4, "C")]
+        with self.assertRaises(ValueError):
+            _link_deck_infos(infos, DeckHierarchy(tuple(info.name for info in infos)))
+        with self.assertRaises(ValueError):
+            _link_deck_infos(infos[1:], DeckHierarchy(("A", "A::B", "B")))
+
+
+if __name__ == "__main__":
+    unittest.main()